@@ -0,0 +1,37 @@
+import os
+import sqlite3
+import threading
+
+from config import CONFIG
+
+
+class CollectionVersions:
+    """Monotonic per-collection content version, bumped on every write to the collection"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS collection_versions ("
+            "collection TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+
+    def get(self, collection_name: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM collection_versions WHERE collection = ?", (collection_name,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, collection_name: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO collection_versions (collection, version) VALUES (?, 1) "
+                "ON CONFLICT(collection) DO UPDATE SET version = version + 1",
+                (collection_name,)
+            )
+
+
+collection_versions = CollectionVersions(os.path.join(CONFIG.CACHE_DIR, "collections.sqlite"))
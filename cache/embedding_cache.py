@@ -0,0 +1,44 @@
+import hashlib
+import os
+import unicodedata
+from typing import List, Optional
+
+import numpy as np
+
+from cache.sqlite_store import SQLiteLRUStore
+from config import CONFIG
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache keyed by (model, sha256 of normalized text)"""
+
+    def __init__(self, path: str, max_entries: int):
+        self.store = SQLiteLRUStore(path, table="embeddings", max_entries=max_entries)
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return f"{model}:{hashlib.sha256(normalized.encode()).hexdigest()}"
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        keys = [self.key(model, text) for text in texts]
+        found = self.store.get_many(keys)
+        return [
+            np.frombuffer(found[key], dtype=np.float32).tolist() if key in found else None
+            for key in keys
+        ]
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        self.store.put_many(
+            (self.key(model, text), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        )
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+embedding_cache = EmbeddingCache(
+    path=os.path.join(CONFIG.CACHE_DIR, "embeddings.sqlite"),
+    max_entries=CONFIG.EMBED_CACHE_MAX_ENTRIES
+) if CONFIG.EMBED_CACHE_ENABLED else None
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+import time
+from typing import List, Optional
+
+from cache.collection_versions import collection_versions
+from cache.sqlite_store import SQLiteLRUStore
+from config import CONFIG
+
+
+class RAGCache:
+    """
+    Cache of full RAG answers.
+
+    The key includes the collection's content version, so any upsert or delete
+    in the collection makes earlier entries unreachable; they are then dropped
+    by LRU eviction. Entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl: float):
+        self.store = SQLiteLRUStore(path, table="rag_results", max_entries=max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def prompt_set_hash(*prompts: object) -> str:
+        return hashlib.sha256(json.dumps(prompts, ensure_ascii=False).encode()).hexdigest()[:16]
+
+    def key(self, collection_name: str, limit: int, prompt_hash: str, models: List[str]) -> str:
+        parts = [collection_name, collection_versions.get(collection_name), limit, prompt_hash, models]
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self.store.get_many([key]).get(key)
+        entry = json.loads(value) if value is not None else None
+        if entry is not None and time.time() - entry["created_at"] > self.ttl:
+            self.store.delete(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["result"]
+
+    def put(self, key: str, result: dict) -> None:
+        entry = {"created_at": time.time(), "result": result}
+        self.store.put_many([(key, json.dumps(entry, ensure_ascii=False).encode())])
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+rag_cache = RAGCache(
+    path=os.path.join(CONFIG.CACHE_DIR, "rag_results.sqlite"),
+    max_entries=CONFIG.RAG_CACHE_MAX_ENTRIES,
+    ttl=CONFIG.RAG_CACHE_TTL_SECONDS
+) if CONFIG.RAG_CACHE_ENABLED else None
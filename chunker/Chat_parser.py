@@ -0,0 +1,174 @@
+import calendar
+import re
+from array import array
+from typing import Dict, Iterable, Iterator, List
+
+# [dd/mm/yyyy, hh:mm:ss] Speaker: text  (also dd.mm.yy and hh:mm)
+HEADER_RE = re.compile(
+    r"^\[(\d{1,2})[./](\d{1,2})[./](\d{2,4}),\s*(\d{1,2}):(\d{2})(?::(\d{2}))?\]\s*([^:\n]+?):[ \t]?",
+    re.MULTILINE
+)
+
+
+class MessageColumns:
+    """
+    Колоночное представление сообщений переписки.
+
+    Вместо списка объектов храним параллельные массивы: время, индекс автора
+    и смещения сообщения в исходном тексте. Сам текст не копируется.
+
+    Атрибуты:
+        text (str): Исходный текст, на который ссылаются смещения.
+        timestamps (array): Время сообщения, секунды epoch (UTC без учёта часового пояса).
+        speaker_ids (array): Индекс автора в списке speakers.
+        starts (array): Начало сообщения (заголовок) в text.
+        body_starts (array): Начало текста сообщения после "Автор: ".
+        ends (array): Конец сообщения в text (без завершающего перевода строки).
+        speakers (list): Имена авторов.
+    """
+
+    def __init__(self, text: str, speakers: List[str] = None):
+        self.text = text
+        self.timestamps = array("d")
+        self.speaker_ids = array("i")
+        self.starts = array("q")
+        self.body_starts = array("q")
+        self.ends = array("q")
+        self.speakers: List[str] = speakers if speakers is not None else []
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def message(self, i: int) -> str:
+        """Полный текст i-го сообщения вместе с заголовком."""
+        return self.text[self.starts[i]:self.ends[i]]
+
+    def body(self, i: int) -> str:
+        """Текст i-го сообщения без заголовка."""
+        return self.text[self.body_starts[i]:self.ends[i]]
+
+    def speaker(self, i: int) -> str:
+        return self.speakers[self.speaker_ids[i]]
+
+    def head(self, n: int) -> "MessageColumns":
+        """Первые n сообщений (ссылаются на тот же текст)."""
+        columns = MessageColumns(self.text, self.speakers)
+        columns.timestamps = self.timestamps[:n]
+        columns.speaker_ids = self.speaker_ids[:n]
+        columns.starts = self.starts[:n]
+        columns.body_starts = self.body_starts[:n]
+        columns.ends = self.ends[:n]
+        return columns
+
+
+class ChatParser:
+    """
+    Однопроходный парсер экспорта переписки WhatsApp/Telegram формата
+    "[dd/mm/yyyy, hh:mm:ss] Speaker: text".
+
+    Строки без заголовка считаются продолжением предыдущего сообщения.
+    Текст до первого заголовка игнорируется.
+    """
+
+    # Во сколько окон может вырасти буфер с одним незавершённым сообщением
+    MAX_CARRY_WINDOWS = 4
+
+    def __init__(self):
+        self._speaker_index: Dict[str, int] = {}
+        self.speakers: List[str] = []
+
+    def _speaker_id(self, name: str) -> int:
+        speaker_id = self._speaker_index.get(name)
+        if speaker_id is None:
+            speaker_id = self._speaker_index[name] = len(self.speakers)
+            self.speakers.append(name)
+        return speaker_id
+
+    @staticmethod
+    def looks_like_chat(text: str) -> bool:
+        return HEADER_RE.search(text) is not None
+
+    def parse(self, text: str) -> MessageColumns:
+        """
+        Разбирает текст в колоночные записи сообщений.
+
+        Args:
+            text (str): Текст экспорта переписки.
+
+        Returns:
+            MessageColumns: Сообщения в колоночном виде.
+        """
+        columns = MessageColumns(text, self.speakers)
+        for match in HEADER_RE.finditer(text):
+            if len(columns):
+                columns.ends.append(self._message_end(text, columns.body_starts[-1], match.start()))
+
+            day, month, year, hour, minute, second, speaker = match.groups()
+            year = int(year)
+            if year < 100:
+                year += 2000
+            columns.timestamps.append(calendar.timegm(
+                (year, int(month), int(day), int(hour), int(minute), int(second or 0))
+            ))
+            columns.speaker_ids.append(self._speaker_id(speaker.strip()))
+            columns.starts.append(match.start())
+            columns.body_starts.append(match.end())
+
+        if len(columns):
+            columns.ends.append(self._message_end(text, columns.body_starts[-1], len(text)))
+        return columns
+
+    @staticmethod
+    def _message_end(text: str, body_start: int, end: int) -> int:
+        while end > body_start and text[end - 1] in "\r\n":
+            end -= 1
+        return end
+
+    def iter_windows(self, pieces: Iterable[str], window_size: int = 64 * 1024) -> Iterator[MessageColumns]:
+        """
+        Потоковый разбор: отдаёт только завершённые сообщения окна, а последнее
+        (возможно, обрезанное) сообщение переносит в следующее окно.
+
+        Перенос ограничен MAX_CARRY_WINDOWS окнами: если одно сообщение длиннее,
+        его прочитанная часть (до последнего перевода строки) отдаётся как
+        отдельное сообщение, а остаток продолжается под тем же заголовком.
+        Так память остаётся ограниченной и для файла, где после первого заголовка
+        больше нет сообщений.
+
+        Args:
+            pieces (Iterable[str]): Последовательные куски текста.
+            window_size (int): Минимальный размер окна в символах.
+
+        Yields:
+            MessageColumns: Сообщения очередного окна.
+        """
+        buffer = ""
+        # Заголовок, перенесённый без текста после сброса части длинного сообщения
+        carried_header = ""
+        for piece in pieces:
+            buffer += piece
+            if len(buffer) < window_size:
+                continue
+
+            columns = self.parse(buffer)
+            if len(columns) >= 2:
+                yield columns.head(len(columns) - 1)
+                buffer = buffer[columns.starts[-1]:]
+                carried_header = ""
+            elif len(buffer) >= window_size * self.MAX_CARRY_WINDOWS:
+                if not len(columns):
+                    # Текст до первого заголовка всё равно игнорируется
+                    buffer = ""
+                    continue
+                body_start = columns.body_starts[-1]
+                cut = buffer.rfind("\n", body_start)
+                cut = cut if cut > body_start else len(buffer)
+                columns.ends[-1] = self._message_end(buffer, body_start, cut)
+                yield columns
+                carried_header = buffer[columns.starts[-1]:body_start]
+                buffer = carried_header + buffer[cut:].lstrip("\r\n")
+
+        if buffer and buffer != carried_header:
+            columns = self.parse(buffer)
+            if len(columns):
+                yield columns
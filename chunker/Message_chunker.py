@@ -0,0 +1,147 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Iterable, Iterator, List, Tuple
+
+from chunker.Chat_parser import ChatParser
+from chunker.Text_chunker import TextChunker
+from generators.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+
+@dataclass
+class Chunk:
+    text: str
+    metadata: dict = field(default_factory=dict)
+
+
+def _wall_clock(timestamp: float) -> str:
+    # Время в экспорте локальное и без часового пояса, поэтому храним его "как есть"
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+# (текст сообщения, время, автор, оценка токенов)
+_Message = Tuple[str, float, str, int]
+
+
+class MessageChunker:
+    """
+    Разбивка переписки на чанки из целых сообщений.
+
+    Сообщения упаковываются в чанк, пока не превышен бюджет токенов; соседние
+    чанки перекрываются на overlap_messages сообщений. Сообщение длиннее
+    бюджета режется рекурсивным сплиттером на части, каждая со своим
+    заголовком. В метаданные чанка попадают временной диапазон и авторы. Если
+    текст не похож на экспорт переписки, используется fallback-сплиттер.
+    """
+
+    # Сколько символов от начала текста смотреть, чтобы распознать экспорт переписки
+    DETECT_SIZE = 4096
+
+    def __init__(self,
+                 max_tokens: int = 400,
+                 overlap_messages: int = 0,
+                 fallback: TextChunker = None):
+        """
+        Args:
+            max_tokens (int): Бюджет токенов на чанк.
+            overlap_messages (int): Сколько последних сообщений повторять в следующем чанке.
+            fallback (TextChunker, optional): Сплиттер для текста без заголовков сообщений.
+        """
+        self.max_tokens = max_tokens
+        self.overlap_messages = overlap_messages
+        self.fallback = fallback or TextChunker()
+
+    def split_text(self, text: str) -> List[Chunk]:
+        """
+        Разбивает входной текст на чанки.
+
+        Args:
+            text (str): Входной текст.
+
+        Returns:
+            list: Список чанков.
+        """
+        return list(self.iter_chunks([text]))
+
+    def iter_chunks(self, pieces: Iterable[str]) -> Iterator[Chunk]:
+        """
+        Потоковая разбивка последовательности кусков текста на чанки.
+
+        Args:
+            pieces (Iterable[str]): Последовательные куски входного текста.
+
+        Yields:
+            Chunk: Чанки с метаданными.
+        """
+        pieces = iter(pieces)
+        head: List[str] = []
+        head_size = 0
+        for piece in pieces:
+            head.append(piece)
+            head_size += len(piece)
+            if head_size >= self.DETECT_SIZE:
+                break
+        first = "".join(head)
+        pieces = chain([first], pieces)
+
+        if not ChatParser.looks_like_chat(first):
+            for text in self.fallback.iter_chunks(pieces):
+                yield Chunk(text)
+            return
+
+        yield from self._pack(self._iter_messages(pieces))
+
+    def _iter_messages(self, pieces: Iterable[str]) -> Iterator[_Message]:
+        parser = ChatParser()
+        for columns in parser.iter_windows(pieces):
+            for i in range(len(columns)):
+                text = columns.message(i)
+                tokens = estimate_tokens(text)
+                if tokens <= self.max_tokens:
+                    yield text, columns.timestamps[i], columns.speaker(i), tokens
+                    continue
+                header = text[:columns.body_starts[i] - columns.starts[i]]
+                for part in self._split_body(header, columns.body(i)):
+                    yield part, columns.timestamps[i], columns.speaker(i), estimate_tokens(part)
+
+    def _split_body(self, header: str, body: str) -> List[str]:
+        """Части слишком длинного сообщения, каждая с заголовком и в пределах бюджета."""
+        chunk_size = max(1, int(self.max_tokens * CHARS_PER_TOKEN) - len(header))
+        splitter = TextChunker(chunk_size=chunk_size, chunk_overlap=chunk_size // 5)
+        return [header + part for part in splitter.split_text(body)]
+
+    def _pack(self, messages: Iterable[_Message]) -> Iterator[Chunk]:
+        current: List[_Message] = []
+        current_tokens = 0
+        new_messages = 0
+
+        for message in messages:
+            tokens = message[3]
+            if new_messages and current_tokens + tokens > self.max_tokens:
+                yield self._make_chunk(current)
+                current = current[-self.overlap_messages:] if self.overlap_messages else []
+                current_tokens = sum(m[3] for m in current)
+                # Перекрытие не должно вытеснять новое сообщение из бюджета
+                while current and current_tokens + tokens > self.max_tokens:
+                    current_tokens -= current.pop(0)[3]
+                new_messages = 0
+
+            current.append(message)
+            current_tokens += tokens
+            new_messages += 1
+
+        if new_messages:
+            yield self._make_chunk(current)
+
+    @staticmethod
+    def _make_chunk(messages: List[_Message]) -> Chunk:
+        speakers = list(dict.fromkeys(m[2] for m in messages))
+        return Chunk(
+            text="\n".join(m[0] for m in messages),
+            metadata={
+                "start_time": _wall_clock(messages[0][1]),
+                "end_time": _wall_clock(messages[-1][1]),
+                "speakers": speakers,
+                "messages_count": len(messages),
+            }
+        )
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterable, Iterator, List
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 class TextChunker:
@@ -24,6 +24,8 @@ class TextChunker:
         if separators is None:
             separators = ["\n\n", "\n", " ", ""]
 
+        self.chunk_size = chunk_size
+
         self.splitter = RecursiveCharacterTextSplitter(
             separators=separators,
             chunk_size=chunk_size,
@@ -42,5 +44,44 @@ class TextChunker:
             list: Список чанков текста.
         """
         return self.splitter.split_text(text)
-    
+
+    def iter_chunks(self, pieces: Iterable[str], window_size: int = None) -> Iterator[str]:
+        """
+        Разбивает поток кусков текста на чанки, не держа весь текст в памяти.
+
+        Текст накапливается в окне; после каждого разбиения окна все чанки, кроме
+        последнего, отдаются наружу, а хвост начиная с последнего чанка переносится
+        в следующее окно.
+
+        Текст не теряется, но результат не всегда совпадает с split_text: если
+        граница окна приходится на абзац длиннее chunk_size, остаток абзаца
+        склеивается со следующими абзацами иначе, и соседние чанки отличаются.
+        Id точек зависят от текста чанка, поэтому для инкрементальной
+        перезагрузки window_size должен оставаться тем же.
+
+        Args:
+            pieces (Iterable[str]): Последовательные куски входного текста.
+            window_size (int, optional): Размер окна в символах.
+
+        Yields:
+            str: Чанки текста.
+        """
+        window_size = window_size or self.chunk_size * 32
+        buffer = ""
+        for piece in pieces:
+            buffer += piece
+            if len(buffer) < window_size:
+                continue
+
+            chunks = self.splitter.split_text(buffer)
+            if len(chunks) < 2:
+                continue
+
+            yield from chunks[:-1]
+            tail_start = buffer.rfind(chunks[-1])
+            buffer = buffer[tail_start:] if tail_start != -1 else chunks[-1]
+
+        if buffer:
+            yield from self.splitter.split_text(buffer)
+
 chunker = TextChunker()
\ No newline at end of file
@@ -0,0 +1,70 @@
+import random
+import sys
+import time
+
+from chunker.Message_chunker import MessageChunker
+from chunker.Text_chunker import TextChunker
+
+SPEAKERS = ["Анна", "Иван"]
+WORDS = ["привет", "как", "дела", "опять", "ты", "не", "ответил", "ревность", "ссора", "люблю",
+         "почему", "всегда", "так", "ок", "завтра", "встретимся", "устала", "работа"]
+
+
+def synthetic_chat(messages: int = 50_000, seed: int = 0) -> str:
+    """
+    Генерирует переписку в формате экспорта "[dd/mm/yyyy, hh:mm:ss] Speaker: text".
+
+    Args:
+        messages (int): Количество сообщений.
+        seed (int): Зерно генератора.
+
+    Returns:
+        str: Текст переписки.
+    """
+    rng = random.Random(seed)
+    lines = []
+    for i in range(messages):
+        day, rest = divmod(i, 500)
+        hour, minute = divmod(rest, 60)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 40)))
+        lines.append(f"[{day % 28 + 1:02d}/01/2024, {hour % 24:02d}:{minute:02d}:00] {SPEAKERS[i % 2]}: {text}")
+    return "\n".join(lines)
+
+
+def bench(name: str, split, text: str, repeats: int = 3) -> None:
+    best = float("inf")
+    chunks = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        chunks = split(text)
+        best = min(best, time.perf_counter() - start)
+
+    texts = [getattr(chunk, "text", chunk) for chunk in chunks]
+    total_chars = sum(len(t) for t in texts)
+    print(f"{name:<12} чанков: {len(texts):>7}  "
+          f"чанков/с: {len(texts) / best:>10.0f}  "
+          f"символов к эмбеддингу: {total_chars:>10} ({total_chars / len(text):.2f}x текста)  "
+          f"время: {best:.3f}s")
+
+
+def main():
+    """
+    Сравнивает RecursiveCharacterTextSplitter (1000/200) и MessageChunker
+    по скорости и количеству чанков.
+
+    Запуск из корня репозитория: python -m chunker.benchmark [файл_переписки]
+    """
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = synthetic_chat()
+    print(f"Размер текста: {len(text)} символов")
+
+    bench("recursive", TextChunker(chunk_size=1000, chunk_overlap=200).split_text, text)
+    bench("messages", MessageChunker(max_tokens=400, overlap_messages=0).split_text, text)
+    bench("messages+1", MessageChunker(max_tokens=400, overlap_messages=1).split_text, text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from typing import Dict, Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
@@ -7,8 +9,80 @@ class Settings(BaseSettings):
     # Service settings
     DEBUG: bool = Field(False, description="Debug mode for FastAPI")
 
+    CPU_EXECUTOR_WORKERS: int = Field(
+        2,
+        description="Max threads for CPU-bound work (chunking, reranking) off the event loop"
+    )
+
+    CACHE_DIR: str = Field("data/cache", description="Directory for local caches and precomputed embeddings")
+
+    # Chunking
+    CHUNKER_MODE: str = Field(
+        "messages",
+        description="'messages' packs whole chat messages (falls back to 'recursive' for non-chat text)"
+    )
+    CHUNK_MAX_TOKENS: int = Field(400, description="Token budget per chunk for the message chunker")
+    CHUNK_OVERLAP_MESSAGES: int = Field(0, description="Messages repeated between neighbouring chunks")
+
+    # Background ingestion
+    UPLOAD_DIR: str = Field("data/uploads", description="Where uploaded files wait for their ingestion job")
+    INGEST_WORKERS: int = Field(2, description="Number of ingestion jobs processed concurrently")
+    INGEST_BATCH_SIZE: int = Field(64, description="Chunks per batch passed between pipeline stages")
+    INGEST_EMBED_WORKERS: int = Field(2, description="Embedding batches in flight per ingestion job")
+    INGEST_QUEUE_SIZE: int = Field(4, description="Max batches buffered between pipeline stages")
+    INGEST_MAX_FINISHED_JOBS: int = Field(1000, description="Finished jobs kept for status queries")
+
     # Qdrant Configuration
     QDRANT_URL: str = Field("qdrant:6333", description="Qdrant server")
+    QDRANT_PREFER_GRPC: bool = Field(False, description="Talk to Qdrant over gRPC instead of HTTP")
+    QDRANT_GRPC_PORT: int = Field(6334, description="Qdrant gRPC port")
+    QDRANT_UPSERT_BATCH_SIZE: int = Field(256, description="Points per upsert request")
+    QDRANT_UPSERT_CONCURRENCY: int = Field(
+        4,
+        description="Unacknowledged upsert requests in flight per ingestion job and per async bulk write"
+    )
+    QDRANT_STORAGE_MODE: str = Field(
+        "collections",
+        description="'collections': one Qdrant collection per chat; "
+                    "'multitenant': all chats in one collection partitioned by the tenant payload field"
+    )
+    QDRANT_SHARED_COLLECTION: str = Field("chats", description="Collection holding all chats in multitenant mode")
+    QDRANT_PROFILE: str = Field(
+        "default",
+        description="Profile for new collections: 'default' (float32 in RAM), 'scalar' (int8) or 'binary' "
+                    "quantization with originals and payloads on disk, see qdrant/profiles.py"
+    )
+    QDRANT_COLLECTION_PROFILES: Dict[str, str] = Field(
+        {},
+        description="Per-collection profile overrides, JSON object of collection name to profile"
+    )
+    QDRANT_HNSW_M: Optional[int] = Field(
+        None,
+        description="HNSW graph degree m for new collections, overrides the profile"
+    )
+    QDRANT_HNSW_EF_CONSTRUCT: Optional[int] = Field(
+        None,
+        description="HNSW ef_construct for new collections, overrides the profile"
+    )
+    QDRANT_HNSW_EF: Optional[int] = Field(None, description="HNSW search-time ef, overrides the profile")
+    QDRANT_COLLECTION_HNSW: Dict[str, Dict[str, int]] = Field(
+        {},
+        description="Per-collection HNSW overrides, JSON object of collection name to "
+                    "{\"m\": ..., \"ef_construct\": ..., \"ef\": ...}; applied over the global ones"
+    )
+    HYBRID_SEARCH: bool = Field(
+        True,
+        description="Store BM25 sparse vectors in new collections and fuse them with dense hits for RAG"
+    )
+    HYBRID_PREFETCH_FACTOR: int = Field(4, description="Candidates per retriever before RRF fusion, times limit")
+    SEARCH_BACKEND: str = Field(
+        "qdrant",
+        description="'qdrant'; 'local': in-process exact search only, no Qdrant; "
+                    "'auto': Qdrant plus a local mirror answering dense searches of small collections "
+                    "(with HYBRID_SEARCH only the BM25 half of RAG retrieval still goes to Qdrant)"
+    )
+    LOCAL_INDEX_DIR: str = Field("data/local_index", description="Memory-mapped indexes of the local backend")
+    LOCAL_MAX_POINTS: int = Field(20_000, description="In 'auto' mode, collections above this size use Qdrant only")
 
 
     MISTRAL_API_KEY: str = Field(..., description="Mistral API key")
@@ -18,6 +92,74 @@ class Settings(BaseSettings):
         description="Mistral model name to use"
     )
 
+    # Embedding client
+    EMBED_MAX_BATCH_TOKENS: int = Field(8000, description="Estimated token budget per embeddings request")
+    EMBED_MAX_BATCH_SIZE: int = Field(128, description="Max texts per embeddings request")
+    EMBED_CONCURRENCY: int = Field(4, description="Max embeddings requests in flight")
+    EMBED_REQUESTS_PER_SECOND: float = Field(1.0, description="Provider quota for embeddings requests")
+    EMBED_BURST: float = Field(1.0, description="Token bucket capacity for embeddings requests")
+    EMBED_RETRY_ATTEMPTS: int = Field(5, description="Attempts per embeddings request on 429/5xx")
+
+    # Embedding provider
+    EMBEDDING_PROVIDER: str = Field(
+        "mistral",
+        description="'mistral' (remote API) or 'local' (sentence-transformers on this box); "
+                    "collections must be searched with the model that indexed them"
+    )
+    LOCAL_EMBED_MODEL: str = Field("deepvk/USER-bge-m3", description="sentence-transformers model for 'local'")
+    LOCAL_EMBED_DEVICE: str = Field("cpu", description="Torch device of the local embedding model")
+    LOCAL_EMBED_BATCH_SIZE: int = Field(32, description="Max texts per local embedding batch")
+    LOCAL_EMBED_MAX_BATCH_TOKENS: int = Field(
+        8192,
+        description="Padded token budget per local batch (items x longest text in the length bucket)"
+    )
+    LOCAL_EMBED_QUANTIZE: bool = Field(False, description="Dynamic int8 quantization of the local model (CPU)")
+    LOCAL_INFERENCE_THREADS: int = Field(
+        4,
+        description="Torch intra-op threads of the API process, shared by the local embedder and the "
+                    "in-process reranker whose calls run one at a time (0 = torch default)"
+    )
+
+    EMBED_CACHE_ENABLED: bool = Field(True, description="Cache embeddings on disk by model and text hash")
+    EMBED_CACHE_MAX_ENTRIES: int = Field(200_000, description="LRU size cap of the embedding cache")
+
+    # RAG result cache
+    RAG_CACHE_ENABLED: bool = Field(True, description="Cache /rag-inference answers per collection version")
+    RAG_CACHE_TTL_SECONDS: float = Field(7 * 24 * 3600, description="Max age of a cached RAG answer")
+    RAG_CACHE_MAX_ENTRIES: int = Field(1000, description="LRU size cap of the RAG answer cache")
+
+    # Reranker Configuration
+    RERANKER_MODEL: str = Field(
+        "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        description="CrossEncoder model used for reranking"
+    )
+    RERANKER_BATCH_SIZE: int = Field(32, description="Max pairs per reranker batch")
+    RERANKER_ENGINE: str = Field(
+        "torch",
+        description="Reranker inference engine: 'torch' (fp32) or 'int8' (dynamic quantization, CPU)"
+    )
+    RERANKER_THREADS: int = Field(
+        0,
+        description="Torch intra-op threads per reranker pool process (0 = torch default); "
+                    "in-process reranking uses LOCAL_INFERENCE_THREADS"
+    )
+    RERANKER_WORKERS: int = Field(0, description="Reranker process pool size; 0 scores in the API process")
+    RERANKER_MAX_BATCH_TOKENS: int = Field(
+        8192,
+        description="Max estimated tokens per reranker batch, counting padding to the longest pair"
+    )
+
+    # RAG context assembly
+    CONTEXT_TOKEN_BUDGET: int = Field(3000, description="Estimated token budget of the context sent to the LLM")
+    CONTEXT_MMR_LAMBDA: float = Field(
+        0.7,
+        description="MMR trade-off: 1.0 ranks by relevance only, lower values favour diverse chunks"
+    )
+    CONTEXT_DEDUP_THRESHOLD: float = Field(
+        0.8,
+        description="Share of word 3-shingles shared with a better chunk above which a chunk is dropped"
+    )
+
     # Setting up langchain tracing
     LANGCHAIN_API_KEY: str = Field(..., description="Langchain API key")
     LANGCHAIN_TRACING_V2: bool = Field(True)
@@ -27,6 +169,15 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = Field(..., description="Opeanai")
     OPENAI_BASE_URL: str = Field(..., description="Opeanai")
     TELEGRAM_TOKEN: str = Field(..., description="Token for tg bot")
+
+    # Telegram bot HTTP client
+    API_URL: str = Field("http://api:8000", description="Base URL of the API used by the bot")
+    BOT_HTTP_MAX_CONNECTIONS: int = Field(100, description="Max concurrent connections from the bot to the API")
+    BOT_HTTP_MAX_KEEPALIVE: int = Field(20, description="Idle keep-alive connections kept in the bot's pool")
+    BOT_HTTP_KEEPALIVE_EXPIRY: float = Field(30.0, description="Seconds an idle pooled connection is kept")
+    BOT_HTTP_TIMEOUT: float = Field(30.0, description="Default timeout of bot requests to the API")
+    BOT_COLLECTIONS_TTL: float = Field(30.0, description="Seconds the bot reuses a fetched collection list")
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,51 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from config import CONFIG
+
+T = TypeVar("T")
+
+# Bounded pool for CPU-bound work (chunking, reranking) so it never runs on the event loop
+cpu_executor = ThreadPoolExecutor(
+    max_workers=CONFIG.CPU_EXECUTOR_WORKERS,
+    thread_name_prefix="cpu-worker"
+)
+
+
+def _init_inference_thread() -> None:
+    import torch
+    if CONFIG.LOCAL_INFERENCE_THREADS > 0:
+        torch.set_num_threads(CONFIG.LOCAL_INFERENCE_THREADS)
+
+
+# Single thread for torch inference in this process (local embedder, in-process reranker).
+# Torch's intra-op thread pool is process-wide: concurrent calls would oversubscribe the cores,
+# so they are serialized here and the thread count is set once, when the thread starts.
+inference_executor = ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix="inference",
+    initializer=_init_inference_thread
+)
+
+
+async def run_in_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking function in the bounded CPU executor, in a copy of the caller's context"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(cpu_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+def run_inference_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run torch inference on the inference thread and wait for it"""
+    context = contextvars.copy_context()
+    return inference_executor.submit(context.run, func, *args, **kwargs).result()
+
+
+async def run_inference(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run torch inference on the inference thread, in a copy of the caller's context"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(inference_executor, functools.partial(context.run, func, *args, **kwargs))
@@ -0,0 +1,69 @@
+from typing import List, Optional
+
+import numpy as np
+import torch
+from loguru import logger
+from sentence_transformers import SentenceTransformer
+
+from executor import run_inference, run_inference_sync
+from generators.embedding_provider import EmbeddingProvider
+from generators.tokens import estimate_tokens, length_buckets
+
+
+class LocalEmbedder(EmbeddingProvider):
+    """
+    On-box sentence-transformers embeddings.
+
+    Texts are sorted by length and grouped into buckets whose padded size
+    (items x longest text) stays within max_batch_tokens, so short chat
+    messages are not padded to the length of the longest chunk.
+
+    Inference runs on the shared inference thread, which also sets the torch
+    thread count (CONFIG.LOCAL_INFERENCE_THREADS).
+    """
+
+    def __init__(
+            self,
+            model_name: str,
+            device: str = "cpu",
+            batch_size: int = 32,
+            max_batch_tokens: int = 8192,
+            quantize: bool = False
+    ):
+        if quantize and device != "cpu":
+            raise ValueError(f"Dynamic int8 quantization runs on CPU only, got device '{device}'")
+        # Quantized vectors differ from fp32 ones, so they are cached under their own model key
+        super().__init__(embed_model=f"{model_name}:int8" if quantize else model_name)
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+        logger.info(f"Loading embedding model: {model_name} on {device}")
+        self.model = SentenceTransformer(model_name, device=device)
+        if quantize:
+            # Dynamic int8 quantization of linear layers: CPU only, weights quantized once at load
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info("Embedding model quantized to int8")
+
+    @torch.inference_mode()
+    def _encode(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        buckets = length_buckets(
+            [estimate_tokens(text) for text in texts],
+            batch_size or self.batch_size,
+            self.max_batch_tokens
+        )
+        logger.info(f"Embedding {len(texts)} texts locally in {len(buckets)} length buckets")
+        vectors = np.empty((len(texts), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        for bucket in buckets:
+            vectors[bucket] = self.model.encode(
+                [texts[i] for i in bucket],
+                batch_size=len(bucket),
+                normalize_embeddings=True,
+                convert_to_numpy=True
+            )
+        return vectors.tolist()
+
+    def _embed_uncached(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        return run_inference_sync(self._encode, texts, batch_size)
+
+    async def _aembed_uncached(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        return await run_inference(self._encode, texts, batch_size)
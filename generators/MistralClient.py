@@ -1,56 +1,154 @@
 from mistralai import Mistral
-from typing import List
+from typing import AsyncIterator, List, Optional
 from config import CONFIG
-import time
+import asyncio
+import httpx
 from loguru import logger
 from langsmith import traceable
+from tenacity import RetryCallState, retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 
+from generators.rate_limiter import TokenBucket
+from generators.tokens import estimate_tokens
+from generators.embedding_provider import EmbeddingProvider
 
-class MistralClient:
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Retry on rate limiting, server errors and transport failures"""
+    status_code = getattr(exc, "status_code", None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def _log_retry(retry_state: RetryCallState) -> None:
+    logger.warning(
+        f"Embedding request failed ({retry_state.outcome.exception()}), "
+        f"retry {retry_state.attempt_number}/{CONFIG.EMBED_RETRY_ATTEMPTS - 1}"
+    )
+
+
+embedding_retry = retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_random_exponential(multiplier=1, max=30),
+    stop=stop_after_attempt(CONFIG.EMBED_RETRY_ATTEMPTS),
+    before_sleep=_log_retry,
+    reraise=True
+)
+
+
+class MistralClient(EmbeddingProvider):
     def __init__(self):
+        super().__init__(embed_model="mistral-embed")
         self.client = Mistral(api_key=CONFIG.MISTRAL_API_KEY)
         self.model = CONFIG.MISTRAL_MODEL
-        self.embed_model = "mistral-embed"
-        self.delay = 2
+        self.max_batch_tokens = CONFIG.EMBED_MAX_BATCH_TOKENS
+        self.max_batch_size = CONFIG.EMBED_MAX_BATCH_SIZE
+        self.rate_limiter = TokenBucket(
+            rate=CONFIG.EMBED_REQUESTS_PER_SECOND,
+            capacity=CONFIG.EMBED_BURST
+        )
+        self._semaphore = asyncio.Semaphore(CONFIG.EMBED_CONCURRENCY)
+
+    def _on_error(self, e: Exception) -> None:
+        if getattr(e, "status_code", None) == 429:
+            self.rate_limiter.penalize()
+            logger.warning(f"Rate limited, embedding rate lowered to {self.rate_limiter.rate:.2f} req/s")
+
+    def _token_batches(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[str]]:
+        """Group consecutive texts into batches bounded by estimated tokens and item count"""
+        max_items = batch_size or self.max_batch_size
+        batches = []
+        current: List[str] = []
+        current_tokens = 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= max_items):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
 
     @traceable()
+    @embedding_retry
     def _get_embeddings_single(self, batch: List[str]) -> List[List[float]]:
         """Single batch request with error handling"""
+        self.rate_limiter.acquire_sync()
         try:
             response = self.client.embeddings.create(
                 model=self.embed_model,
                 inputs=batch
             )
+            self.rate_limiter.reward()
             return [data.embedding for data in response.data]
         except Exception as e:
+            self._on_error(e)
             logger.error(f"API Error details: {str(e)}")
             logger.error(f"Batch size: {len(batch)}")
             raise
 
     @traceable()
-    def get_embeddings_batch(self, texts: List[str], batch_size: int = 20) -> List[List[float]]:
-        """Process texts in batches with rate limiting"""
-        total_batches = (len(texts) + batch_size - 1) // batch_size
-        logger.info(f"Processing {len(texts)} texts in {total_batches} batches")
+    @embedding_retry
+    async def _aget_embeddings_single(self, batch: List[str]) -> List[List[float]]:
+        """Single async batch request with error handling"""
+        await self.rate_limiter.acquire()
+        try:
+            response = await self.client.embeddings.create_async(
+                model=self.embed_model,
+                inputs=batch
+            )
+            self.rate_limiter.reward()
+            return [data.embedding for data in response.data]
+        except Exception as e:
+            self._on_error(e)
+            logger.error(f"API Error details: {str(e)}")
+            logger.error(f"Batch size: {len(batch)}")
+            raise
+
+    def _embed_uncached(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Process texts in token-bounded batches with rate limiting"""
+        batches = self._token_batches(texts, batch_size)
+        logger.info(f"Processing {len(texts)} texts in {len(batches)} batches")
         all_embeddings = []
 
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            current_batch = i // batch_size + 1
+        for current_batch, batch in enumerate(batches, 1):
             try:
                 batch_embeddings = self._get_embeddings_single(batch)
                 all_embeddings.extend(batch_embeddings)
-                logger.info(f"Batch {current_batch}/{total_batches} processed")
-                time.sleep(self.delay)
+                logger.info(f"Batch {current_batch}/{len(batches)} processed")
             except Exception as e:
                 logger.error(f"Failed to process batch {current_batch}: {str(e)}")
                 raise
 
         return all_embeddings
 
-    @traceable()
-    def inference_llm(self, system_prompt: str, llm_query: str, context: str) -> str:
-        logger.info("Starting LLM inference")
+    async def _aembed_uncached(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """
+        Process token-bounded batches concurrently under the rate limiter.
+        Output order matches input order.
+        """
+        batches = self._token_batches(texts, batch_size)
+        logger.info(f"Processing {len(texts)} texts in {len(batches)} batches")
+
+        async def process(current_batch: int, batch: List[str]) -> List[List[float]]:
+            async with self._semaphore:
+                try:
+                    batch_embeddings = await self._aget_embeddings_single(batch)
+                    logger.info(f"Batch {current_batch}/{len(batches)} processed")
+                    return batch_embeddings
+                except Exception as e:
+                    logger.error(f"Failed to process batch {current_batch}: {str(e)}")
+                    raise
+
+        results = await asyncio.gather(*(
+            process(current_batch, batch) for current_batch, batch in enumerate(batches, 1)
+        ))
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+    @staticmethod
+    def _build_messages(system_prompt: str, llm_query: str, context: str) -> List[dict]:
         messages = [
             {"role": "system", "content": system_prompt}
         ]
@@ -58,6 +156,12 @@ class MistralClient:
         prompt = f"Контекст из релевантной запросу переписки:\n{context}\n\nЗапрос на психологическую консультацию: {llm_query}"
 
         messages.append({"role": "user", "content": prompt})
+        return messages
+
+    @traceable()
+    def inference_llm(self, system_prompt: str, llm_query: str, context: str) -> str:
+        logger.info("Starting LLM inference")
+        messages = self._build_messages(system_prompt, llm_query, context)
 
         try:
             response = self.client.chat.complete(
@@ -70,5 +174,43 @@ class MistralClient:
             logger.error(f"Chat completion error: {str(e)}")
             raise
 
+    @traceable()
+    async def ainference_llm(self, system_prompt: str, llm_query: str, context: str) -> str:
+        logger.info("Starting async LLM inference")
+        messages = self._build_messages(system_prompt, llm_query, context)
+
+        try:
+            response = await self.client.chat.complete_async(
+                model=self.model,
+                messages=messages
+            )
+            logger.info("LLM inference completed")
+            return response.choices[0].message.content
+        except Exception as e:
+            logger.error(f"Chat completion error: {str(e)}")
+            raise
+
+
+    async def astream_llm(self, system_prompt: str, llm_query: str, context: str) -> AsyncIterator[str]:
+        """Stream the answer as text deltas via the SDK's streaming chat API"""
+        logger.info("Starting streaming LLM inference")
+        messages = self._build_messages(system_prompt, llm_query, context)
+
+        try:
+            response = await self.client.chat.stream_async(
+                model=self.model,
+                messages=messages
+            )
+            async for event in response:
+                delta = event.data.choices[0].delta.content
+                if isinstance(delta, list):
+                    delta = "".join(getattr(chunk, "text", "") for chunk in delta)
+                if delta:
+                    yield delta
+            logger.info("LLM streaming completed")
+        except Exception as e:
+            logger.error(f"Chat streaming error: {str(e)}")
+            raise
+
 
 mistral = MistralClient()
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import time
+from typing import List
+
+from chunker.Message_chunker import MessageChunker
+from chunker.benchmark import synthetic_chat
+from config import CONFIG
+from generators.embedding_provider import EmbeddingProvider
+from generators.tokens import estimate_tokens
+
+
+def load_provider(name: str, quantize: bool) -> EmbeddingProvider:
+    if name == "local":
+        from generators.LocalEmbedder import LocalEmbedder
+        return LocalEmbedder(
+            model_name=CONFIG.LOCAL_EMBED_MODEL,
+            device=CONFIG.LOCAL_EMBED_DEVICE,
+            batch_size=CONFIG.LOCAL_EMBED_BATCH_SIZE,
+            max_batch_tokens=CONFIG.LOCAL_EMBED_MAX_BATCH_TOKENS,
+            quantize=quantize
+        )
+    from generators.MistralClient import MistralClient
+    return MistralClient()
+
+
+async def bench(name: str, provider: EmbeddingProvider, texts: List[str]) -> None:
+    # Measure the backend itself, not the cache
+    provider.cache = None
+    await provider.aget_embeddings_batch(texts[:8])
+
+    start = time.perf_counter()
+    vectors = await provider.aget_embeddings_batch(texts)
+    elapsed = time.perf_counter() - start
+
+    tokens = sum(estimate_tokens(text) for text in texts)
+    print(f"{name:<12} texts: {len(vectors):>6}  dim: {len(vectors[0]):>5}  "
+          f"texts/s: {len(texts) / elapsed:>8.1f}  tokens/s: {tokens / elapsed:>9.0f}  time: {elapsed:.2f}s")
+
+
+async def main():
+    """
+    Compares embedding throughput of the configured providers on chat chunks.
+
+    Run from the repository root:
+        python -m generators.benchmark_embeddings [--providers mistral local local-int8] [--chunks 512]
+    """
+    parser = argparse.ArgumentParser(description="Embedding provider throughput")
+    parser.add_argument("--providers", nargs="+", default=["mistral", "local", "local-int8"],
+                        choices=["mistral", "local", "local-int8"])
+    parser.add_argument("--chunks", type=int, default=512, help="Number of chat chunks to embed")
+    args = parser.parse_args()
+
+    chunker = MessageChunker(max_tokens=CONFIG.CHUNK_MAX_TOKENS)
+    texts = [chunk.text for chunk in chunker.split_text(synthetic_chat(messages=args.chunks * 20))][:args.chunks]
+    print(f"Chunks: {len(texts)}, estimated tokens: {sum(estimate_tokens(text) for text in texts)}")
+
+    for name in args.providers:
+        provider = load_provider("local" if name.startswith("local") else name, quantize=name == "local-int8")
+        await bench(name, provider, texts)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+from langsmith import traceable
+from loguru import logger
+
+from cache.embedding_cache import EmbeddingCache, embedding_cache
+from executor import run_in_executor
+
+
+class EmbeddingProvider(ABC):
+    """
+    Embedding backend used for documents and queries.
+
+    The embedding cache lookup is shared; subclasses only embed the texts
+    that are not cached yet.
+    """
+
+    def __init__(self, embed_model: str, cache: Optional[EmbeddingCache] = embedding_cache) -> None:
+        super().__init__()
+        self.embed_model = embed_model
+        self.cache = cache
+
+    @abstractmethod
+    def _embed_uncached(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        pass
+
+    @abstractmethod
+    async def _aembed_uncached(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        pass
+
+    def _lookup_cache(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], List[str]]:
+        """Cached vectors aligned with texts (None on miss) and the unique texts still to embed"""
+        if self.cache is None:
+            return [None] * len(texts), list(dict.fromkeys(texts))
+        cached = self.cache.get_many(self.embed_model, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        logger.info(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} to embed")
+        return cached, missing
+
+    def _merge_cache(
+            self,
+            texts: List[str],
+            cached: List[Optional[List[float]]],
+            missing: List[str],
+            computed: List[List[float]]
+    ) -> List[List[float]]:
+        if self.cache is not None and missing:
+            self.cache.put_many(self.embed_model, missing, computed)
+        by_text = dict(zip(missing, computed))
+        return [vector if vector is not None else by_text[text] for text, vector in zip(texts, cached)]
+
+    @traceable()
+    def get_embeddings_batch(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Embed texts, serving repeated ones from the embedding cache"""
+        cached, missing = self._lookup_cache(texts)
+        computed = self._embed_uncached(missing, batch_size) if missing else []
+        return self._merge_cache(texts, cached, missing, computed)
+
+    @traceable()
+    async def aget_embeddings_batch(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Async embed texts, serving repeated ones from the embedding cache"""
+        # The SQLite cache is blocking I/O, so it is read and written in the executor
+        cached, missing = await run_in_executor(self._lookup_cache, texts)
+        computed = await self._aembed_uncached(missing, batch_size) if missing else []
+        return await run_in_executor(self._merge_cache, texts, cached, missing, computed)
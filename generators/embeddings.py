@@ -0,0 +1,22 @@
+from config import CONFIG
+from generators.embedding_provider import EmbeddingProvider
+
+
+def create_embedder() -> EmbeddingProvider:
+    """Embedding provider selected by CONFIG.EMBEDDING_PROVIDER"""
+    if CONFIG.EMBEDDING_PROVIDER == "local":
+        from generators.LocalEmbedder import LocalEmbedder
+        return LocalEmbedder(
+            model_name=CONFIG.LOCAL_EMBED_MODEL,
+            device=CONFIG.LOCAL_EMBED_DEVICE,
+            batch_size=CONFIG.LOCAL_EMBED_BATCH_SIZE,
+            max_batch_tokens=CONFIG.LOCAL_EMBED_MAX_BATCH_TOKENS,
+            quantize=CONFIG.LOCAL_EMBED_QUANTIZE
+        )
+    if CONFIG.EMBEDDING_PROVIDER != "mistral":
+        raise ValueError(f"Unknown embedding provider '{CONFIG.EMBEDDING_PROVIDER}', expected 'mistral' or 'local'")
+    from generators.MistralClient import mistral
+    return mistral
+
+
+embedder = create_embedder()
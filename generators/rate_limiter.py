@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter usable from both sync and async code.
+
+    The rate adapts AIMD-style: `penalize` halves it after a 429 from the provider,
+    `reward` raises it back step by step after successful requests.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, min_rate: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount: float) -> float:
+        """Take tokens now and return how long the caller has to wait for them"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        delay = self._reserve(amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, amount: float = 1.0) -> None:
+        delay = self._reserve(amount)
+        if delay > 0:
+            time.sleep(delay)
+
+    def penalize(self) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
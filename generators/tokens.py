@@ -0,0 +1,33 @@
+import math
+from typing import List
+
+# Conservative estimate for mixed Russian/English chat text: Cyrillic tokenizes
+# noticeably denser than English, so we assume fewer characters per token
+CHARS_PER_TOKEN = 2.5
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without loading a tokenizer"""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def length_buckets(lengths: List[int], batch_size: int, max_batch_tokens: int) -> List[List[int]]:
+    """
+    Indices of items grouped by similar token length, longest first.
+
+    A bucket holds at most batch_size items and at most max_batch_tokens tokens
+    counting padding to its longest item, so short items are not padded to the
+    length of the longest one in the whole batch.
+    """
+    buckets = []
+    current: List[int] = []
+    longest = 0
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True):
+        longest = max(longest, lengths[i])
+        if current and (len(current) >= batch_size or (len(current) + 1) * longest > max_batch_tokens):
+            buckets.append(current)
+            current, longest = [], lengths[i]
+        current.append(i)
+    if current:
+        buckets.append(current)
+    return buckets
@@ -0,0 +1,292 @@
+import asyncio
+import codecs
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from itertools import islice
+from typing import Awaitable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from chunker.Message_chunker import Chunk, MessageChunker
+from chunker.Text_chunker import chunker
+from config import CONFIG
+from executor import run_in_executor
+from generators.embeddings import embedder
+from metrics import stage
+from qdrant.QdrantClient import qdrant_client
+
+
+class UploadMode(str, Enum):
+    # Embed and upsert only chunks that are not stored yet
+    INCREMENTAL = "incremental"
+    # Re-embed and rewrite every chunk
+    FULL = "full"
+
+
+class JobStage(str, Enum):
+    QUEUED = "queued"
+    INDEXING = "indexing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class IngestionJob:
+    collection_name: str
+    filename: str
+    path: str
+    mode: UploadMode = UploadMode.INCREMENTAL
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    stage: JobStage = JobStage.QUEUED
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_upserted: int = 0
+    chunks_skipped: int = 0
+    chunks_deleted: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in (JobStage.COMPLETED, JobStage.FAILED)
+
+    def update(self, **changes) -> None:
+        for name, value in changes.items():
+            setattr(self, name, value)
+        self.updated_at = time.time()
+
+
+message_chunker = MessageChunker(
+    max_tokens=CONFIG.CHUNK_MAX_TOKENS,
+    overlap_messages=CONFIG.CHUNK_OVERLAP_MESSAGES,
+    fallback=chunker
+)
+
+
+def iter_chunks(path: str) -> Iterator[Chunk]:
+    pieces = iter_text(path)
+    if CONFIG.CHUNKER_MODE == "recursive":
+        return (Chunk(text) for text in chunker.iter_chunks(pieces))
+    return message_chunker.iter_chunks(pieces)
+
+
+def iter_text(path: str, read_size: int = 64 * 1024) -> Iterator[str]:
+    """Read and decode a UTF-8 file incrementally"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open(path, "rb") as f:
+        while block := f.read(read_size):
+            text = decoder.decode(block)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _take(iterator: Iterator[Chunk], n: int) -> List[Chunk]:
+    return list(islice(iterator, n))
+
+
+async def _run_stages(*stages: Awaitable) -> None:
+    """Run pipeline stages together; the first failure cancels the rest"""
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def ingest(job: IngestionJob) -> None:
+    """
+    Stream one uploaded file through chunk -> embed -> upsert stages.
+
+    Stages are connected by bounded queues, so reading and chunking pause when
+    embedding falls behind, and upserts of earlier batches overlap with the
+    embedding of later ones. Memory stays bounded by the queue sizes.
+    """
+    job.update(stage=JobStage.INDEXING)
+    batch_size = CONFIG.INGEST_BATCH_SIZE
+    embed_workers = CONFIG.INGEST_EMBED_WORKERS
+    embed_queue: asyncio.Queue = asyncio.Queue(maxsize=CONFIG.INGEST_QUEUE_SIZE)
+    upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=CONFIG.INGEST_QUEUE_SIZE)
+
+    existing_ids = await qdrant_client.aexisting_ids(job.collection_name, job.filename)
+    seen_ids = set()
+
+    def new_chunks(batch: List[Chunk]) -> List[Chunk]:
+        """Drop repeated chunks and, in incremental mode, chunks that are already stored"""
+        fresh = []
+        for chunk in batch:
+            chunk_id = qdrant_client.point_id(job.collection_name, job.filename, chunk.text)
+            if chunk_id in seen_ids:
+                continue
+            seen_ids.add(chunk_id)
+            if job.mode == UploadMode.INCREMENTAL and chunk_id in existing_ids:
+                continue
+            fresh.append(chunk)
+        return fresh
+
+    async def chunk_stage() -> None:
+        chunks = iter_chunks(job.path)
+        while True:
+            with stage("chunk"):
+                batch = await run_in_executor(_take, chunks, batch_size)
+            if not batch:
+                break
+            fresh = new_chunks(batch)
+            job.update(
+                chunks_total=job.chunks_total + len(batch),
+                chunks_skipped=job.chunks_skipped + len(batch) - len(fresh)
+            )
+            if fresh:
+                await embed_queue.put(fresh)
+        logger.info(f"Job {job.job_id}: generated {job.chunks_total} chunks, {job.chunks_skipped} unchanged")
+        for _ in range(embed_workers):
+            await embed_queue.put(None)
+
+    async def embed_stage() -> None:
+        while (batch := await embed_queue.get()) is not None:
+            with stage("embed", batch_size=len(batch)):
+                embeddings = await embedder.aget_embeddings_batch([chunk.text for chunk in batch])
+            job.update(chunks_embedded=job.chunks_embedded + len(batch))
+            await upsert_queue.put((batch, embeddings))
+        await upsert_queue.put(None)
+
+    async def save(item: Tuple[List[Chunk], List[List[float]]], wait: bool) -> None:
+        batch, embeddings = item
+        with stage("upsert", batch_size=len(batch)):
+            await qdrant_client.asave_chunks(
+                collection_name=job.collection_name,
+                chunks=[chunk.text for chunk in batch],
+                vectors=embeddings,
+                filename=job.filename,
+                metadatas=[chunk.metadata for chunk in batch],
+                wait=wait
+            )
+        job.update(chunks_upserted=job.chunks_upserted + len(batch))
+
+    async def upsert_stage() -> None:
+        """
+        Batches are written without waiting for Qdrant to apply them, up to
+        QDRANT_UPSERT_CONCURRENCY at a time. The last batch of the job is held
+        back and written with wait=True once all others are acknowledged: it is
+        the job's single completion barrier.
+        """
+        slots = asyncio.Semaphore(CONFIG.QDRANT_UPSERT_CONCURRENCY)
+        writes: List[asyncio.Task] = []
+        held = None
+        finished_workers = 0
+        try:
+            while finished_workers < embed_workers:
+                item = await upsert_queue.get()
+                if item is None:
+                    finished_workers += 1
+                    continue
+                if held is not None:
+                    await slots.acquire()
+                    write = asyncio.ensure_future(save(held, wait=False))
+                    write.add_done_callback(lambda _: slots.release())
+                    writes.append(write)
+                    # Surface failed writes early and drop finished ones
+                    for done in [w for w in writes if w.done()]:
+                        done.result()
+                        writes.remove(done)
+                held = item
+            await asyncio.gather(*writes)
+            if held is not None:
+                await save(held, wait=True)
+        finally:
+            for write in writes:
+                write.cancel()
+
+    await _run_stages(
+        chunk_stage(),
+        *(embed_stage() for _ in range(embed_workers)),
+        upsert_stage()
+    )
+
+    # Points of this file whose chunks are gone from the new upload
+    stale_ids = existing_ids - seen_ids
+    if stale_ids:
+        await qdrant_client.adelete_points(job.collection_name, stale_ids)
+        job.update(chunks_deleted=len(stale_ids))
+
+
+class IngestionJobManager:
+    """In-process job queue served by a fixed pool of asyncio workers"""
+
+    def __init__(self, workers: int, max_finished_jobs: int, upload_dir: str):
+        self.workers = workers
+        self.max_finished_jobs = max_finished_jobs
+        self.upload_dir = upload_dir
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info(f"Started {self.workers} ingestion workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def new_upload_path(self) -> str:
+        return os.path.join(self.upload_dir, uuid.uuid4().hex)
+
+    def submit(
+            self,
+            collection_name: str,
+            filename: str,
+            path: str,
+            mode: UploadMode = UploadMode.INCREMENTAL
+    ) -> IngestionJob:
+        job = IngestionJob(collection_name=collection_name, filename=filename, path=path, mode=mode)
+        self.jobs[job.job_id] = job
+        self._forget_finished()
+        self._queue.put_nowait(job)
+        logger.info(f"Queued ingestion job {job.job_id} for collection {collection_name}")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def _forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                logger.info(f"Worker {n} started job {job.job_id}")
+                await ingest(job)
+                job.update(stage=JobStage.COMPLETED)
+                logger.info(f"Job {job.job_id} completed")
+            except Exception as e:
+                logger.error(f"Job {job.job_id} failed: {str(e)}")
+                job.update(stage=JobStage.FAILED, error=str(e))
+            finally:
+                if os.path.exists(job.path):
+                    os.remove(job.path)
+                self._queue.task_done()
+
+
+ingestion_jobs = IngestionJobManager(
+    workers=CONFIG.INGEST_WORKERS,
+    max_finished_jobs=CONFIG.INGEST_MAX_FINISHED_JOBS,
+    upload_dir=CONFIG.UPLOAD_DIR
+)
@@ -1,74 +1,169 @@
-from typing import List
-from fastapi import FastAPI, UploadFile, File, HTTPException, status
+import json
+import time
+from typing import List, Optional
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from generators.MistralClient import mistral
+from generators.embeddings import embedder
 from qdrant.QdrantClient import qdrant_client
-from chunker.Text_chunker import chunker
-from reranker.Reranker import Reranker
-from schemas import SearchResult, UploadResponse, SearchRequest, SearchResponse, RAGRequest, RAGResponse, CollectionListResponse
+from jobs.ingestion import UploadMode, ingestion_jobs
+from reranker.Reranker import reranker
+from reranker.context_builder import context_builder
+from schemas import SearchResult, UploadResponse, UploadStatusResponse, SearchRequest, SearchResponse, BatchSearchRequest, BatchSearchResponse, RAGRequest, RAGResponse, CollectionListResponse
 from loguru import logger
 from prompts.vector_search import vector_search_prompts
+from prompts.embedding_bank import PromptEmbeddingBank
 from qdrant_client.models import ScoredPoint
 from prompts.llm_inference import llm_query_prompt, system_prompt
 from langsmith import traceable
+from executor import run_in_executor
+from config import CONFIG
+from cache.rag_cache import RAGCache, rag_cache
+from cache.collection_versions import collection_versions
+from cache.single_flight import embed_flight, search_flight, rerank_flight, llm_flight, flights
+from cache.embedding_cache import embedding_cache
+from metrics import REQUEST_SECONDS, server_timing, stage, start_timings
 
 app = FastAPI()
 
+UPLOAD_READ_SIZE = 1024 * 1024
 
-@app.post("/upload/{collection_name}", response_model=UploadResponse, status_code=status.HTTP_201_CREATED)
-@traceable()
-async def upload_file(collection_name: str, file: UploadFile = File(...)):
-    try:
-        logger.info(f"Starting file upload to collection: {collection_name}")
-        content = await file.read()
-        text = content.decode()
+RAG_PROMPT_HASH = RAGCache.prompt_set_hash(vector_search_prompts, llm_query_prompt, system_prompt)
 
-        logger.info("Splitting text into chunks")
-        chunks = chunker.split_text(text)
-        logger.info(f"Generated {len(chunks)} chunks")
+vector_search_bank = PromptEmbeddingBank(
+    prompts=vector_search_prompts,
+    model_name=embedder.embed_model,
+    cache_dir=CONFIG.CACHE_DIR
+)
 
-        logger.info("Generating embeddings")
-        embeddings = mistral.get_embeddings_batch(chunks)
-        logger.info(f"Generated {len(embeddings)} embeddings")
 
-        logger.info("Ensuring collection exists")
-        qdrant_client.ensure_collection_exists(
-            collection_name=collection_name,
-            vector_size=len(embeddings[0])
-        )
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Per-request stage timings as a Server-Timing header"""
+    timings = start_timings()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    route = request.scope.get("route")
+    REQUEST_SECONDS.labels(
+        request.method, route.path if route is not None else "unmatched", response.status_code
+    ).observe(elapsed)
+    response.headers["Server-Timing"] = server_timing(timings, elapsed)
+    return response
+
+
+@app.on_event("startup")
+async def start_ingestion_workers():
+    await ingestion_jobs.start()
+
+
+@app.on_event("shutdown")
+async def stop_ingestion_workers():
+    await ingestion_jobs.stop()
+
 
-        logger.info("Saving chunks to Qdrant")
-        qdrant_client.save_chunks(
+@app.on_event("shutdown")
+async def stop_reranker_pool():
+    reranker.close()
+
+
+@app.on_event("startup")
+async def load_prompt_embeddings():
+    try:
+        await vector_search_bank.aget(embedder.aget_embeddings_batch)
+    except Exception as e:
+        logger.warning(f"Prompt embeddings not ready at startup, will retry on first request: {str(e)}")
+
+
+@app.post("/upload/{collection_name}", response_model=UploadResponse, status_code=status.HTTP_202_ACCEPTED)
+@traceable()
+async def upload_file(
+        collection_name: str,
+        file: UploadFile = File(...),
+        mode: UploadMode = UploadMode.INCREMENTAL
+):
+    """
+    Accepts chunked (streamed) multipart bodies: the form parser spools the file
+    to a temporary file past 1MB, and it is copied to the job file in 1MB reads.
+    """
+    try:
+        logger.info(f"Starting file upload to collection: {collection_name}")
+        path = ingestion_jobs.new_upload_path()
+        with stage("read"):
+            # Disk writes go to the executor so a large upload does not stall the event loop
+            f = await run_in_executor(open, path, "wb")
+            try:
+                while chunk := await file.read(UPLOAD_READ_SIZE):
+                    await run_in_executor(f.write, chunk)
+            finally:
+                await run_in_executor(f.close)
+
+        job = ingestion_jobs.submit(
             collection_name=collection_name,
-            chunks=chunks,
-            vectors=embeddings,
-            filename=file.filename or 'unnamed_file'
+            filename=file.filename or 'unnamed_file',
+            path=path,
+            mode=mode
         )
-        logger.info("Upload completed successfully")
 
         return UploadResponse(
-            chunks_count=len(chunks),
+            job_id=job.job_id,
             collection_name=collection_name,
-            message="Upload successful"
+            message="Upload queued"
         )
     except Exception as e:
         logger.error(f"Error during upload: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/upload/status/{job_id}", response_model=UploadStatusResponse)
+async def upload_status(job_id: str):
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+
+    return UploadStatusResponse(
+        job_id=job.job_id,
+        collection_name=job.collection_name,
+        filename=job.filename,
+        mode=job.mode.value,
+        stage=job.stage.value,
+        chunks_total=job.chunks_total,
+        chunks_embedded=job.chunks_embedded,
+        chunks_upserted=job.chunks_upserted,
+        chunks_skipped=job.chunks_skipped,
+        chunks_deleted=job.chunks_deleted,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
+
+
 @app.post("/search", response_model=SearchResponse)
 @traceable()
 async def search_documents(request: SearchRequest):
     try:
         logger.info(f"Searching in collection: {request.collection_name}")
         logger.info("Generating embedding for search query")
-        embeddings = mistral.get_embeddings_batch([request.text])[0]
+        with stage("embed", batch_size=1):
+            embeddings = (await embed_flight.do(
+                (embedder.embed_model, request.text),
+                lambda: embedder.aget_embeddings_batch([request.text])
+            ))[0]
 
         logger.info(f"Searching for similar vectors, limit: {request.limit}")
-        results = qdrant_client.search_by_vector(
-            collection_name=request.collection_name,
-            query_vector=embeddings,
-            limit=request.limit
-        )
+        with stage("search", batch_size=1):
+            results = await search_flight.do(
+                (request.collection_name, collection_versions.get(request.collection_name), request.limit,
+                 request.exact, request.text),
+                lambda: qdrant_client.asearch_by_vector(
+                    collection_name=request.collection_name,
+                    query_vector=embeddings,
+                    limit=request.limit,
+                    exact=request.exact
+                )
+            )
         logger.info(f"Found {len(results)} results")
 
         return SearchResponse(
@@ -80,103 +175,234 @@ async def search_documents(request: SearchRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/rag-inference", response_model=RAGResponse)
+@app.post("/search/batch", response_model=BatchSearchResponse)
 @traceable()
-async def rag_inference(request: RAGRequest):
+async def search_documents_batch(request: BatchSearchRequest):
     try:
-        logger.info(f"Starting RAG inference for collection: {request.collection_name}")
+        logger.info(f"Batch searching {len(request.texts)} queries in collection: {request.collection_name}")
+        logger.info("Generating embeddings for search queries")
+        texts = tuple(request.texts)
+        with stage("embed", batch_size=len(texts)):
+            embeddings = await embed_flight.do(
+                (embedder.embed_model, texts),
+                lambda: embedder.aget_embeddings_batch(request.texts)
+            )
 
-        logger.info("Generating embeddings for search prompts")
-        vector_search_embedding = mistral.get_embeddings_batch(vector_search_prompts)
+        logger.info(f"Searching for similar vectors, limit: {request.limit}")
+        with stage("search", batch_size=len(texts)):
+            results = await search_flight.do(
+                (request.collection_name, collection_versions.get(request.collection_name), request.limit,
+                 request.exact, texts),
+                lambda: qdrant_client.asearch_batch(
+                    collection_name=request.collection_name,
+                    query_vectors=embeddings,
+                    limit=request.limit,
+                    exact=request.exact
+                )
+            )
+        logger.info(f"Found {sum(len(res) for res in results)} results")
+
+        return BatchSearchResponse(
+            results=[[SearchResult(text=res.payload.get("content", ""), score=res.score)
+                      for res in group]
+                     for group in results]
+        )
+    except Exception as e:
+        logger.error(f"Error during batch search: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def rag_cache_key(request: RAGRequest) -> Optional[str]:
+    if rag_cache is None:
+        return None
+    return rag_cache.key(
+        collection_name=request.collection_name,
+        limit=request.limit,
+        prompt_hash=RAG_PROMPT_HASH,
+        models=[mistral.model, embedder.embed_model, reranker.model_name, context_builder.signature]
+    )
 
-        # Get results for each search prompt
-        vector_search_res: List[ScoredPoint] = []
-        for idx, embedding in enumerate(vector_search_embedding):
-            logger.info(f"Searching with prompt {idx + 1}")
-            results = qdrant_client.search_by_vector(
+
+async def retrieve_context(request: RAGRequest) -> str:
+    """Search with all RAG prompts and assemble the reranked hits into the LLM context"""
+    logger.info("Loading embeddings for search prompts")
+    with stage("embed", batch_size=len(vector_search_prompts)):
+        vector_search_embedding = await embed_flight.do(
+            (embedder.embed_model, RAG_PROMPT_HASH),
+            lambda: vector_search_bank.aget(embedder.aget_embeddings_batch)
+        )
+
+    # Concurrent requests for the same collection state share search and rerank
+    flight_key = (
+        request.collection_name,
+        collection_versions.get(request.collection_name),
+        request.limit,
+        RAG_PROMPT_HASH
+    )
+
+    # Get results for all search prompts in one batch query
+    logger.info(f"Searching with {len(vector_search_embedding)} prompts")
+    with stage("search", batch_size=len(vector_search_prompts)):
+        vector_search_res: List[List[ScoredPoint]] = await search_flight.do(
+            flight_key,
+            lambda: qdrant_client.ahybrid_search_batch(
                 collection_name=request.collection_name,
-                query_vector=embedding,
-                limit=request.limit
+                query_vectors=vector_search_embedding.tolist(),
+                query_texts=vector_search_prompts,
+                limit=request.limit,
+                with_vectors=True
             )
-            vector_search_res.append(results)
-
-        # Remove duplicates and sort by score
-        all_data = []
-
-        for idx, vec in enumerate(vector_search_res):
-            logger.info(f"Processing vector result #{idx}")
-            unique_results = []
-            seen_contents = set()
-
-            for res_idx, res in enumerate(vec):
-                try:
-                    # Обращаемся напрямую к content, так как это строка
-                    content = res.payload['content']
-                    
-                    if content not in seen_contents:
-                        seen_contents.add(content)
-                        unique_results.append(res)
-                except Exception as e:
-                    logger.error(f"Error processing result: {str(e)}")
-                    continue
-                    
-            all_data.append(unique_results)
-
-        # Преобразование результатов
-        all_data_clear = []
-        for item in all_data:
-            try:
-                # Берем напрямую content из payload
-                contents = [message.payload['content'] for message in item]
-                all_data_clear.append(contents)
-            except Exception as e:
-                logger.error(f"Error extracting contents: {str(e)}")
-                all_data_clear.append([])
+        )
+
+    hits = sum(len(res) for res in vector_search_res)
+    if not hits:
+        # Unknown tenant or local mirror: do not pay for an LLM call on an empty context
+        raise HTTPException(
+            status_code=404,
+            detail=f"No documents found in collection: {request.collection_name}"
+        )
+
+    logger.info(f"Assembling context from {hits} hits")
+    with stage("rerank", batch_size=hits):
+        context = await rerank_flight.do(
+            flight_key,
+            lambda: context_builder.abuild(vector_search_prompts, vector_search_res)
+        )
+
+    return context
+
 
-        logger.info(f"Processed data: {all_data_clear}")
-        reranker = Reranker("cross-encoder/ms-marco-MiniLM-L-6-v2")
+@app.post("/rag-inference", response_model=RAGResponse)
+@traceable()
+async def rag_inference(request: RAGRequest):
+    try:
+        logger.info(f"Starting RAG inference for collection: {request.collection_name}")
 
-        reranker_list = reranker.rerank(vector_search_prompts, all_data_clear)
+        cache_key = rag_cache_key(request)
+        if cache_key is not None:
+            cached = rag_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Returning cached RAG result")
+                return RAGResponse(**cached)
+
+        reranker_list = await retrieve_context(request)
 
         # Combine context and generate response
         logger.info("Generating LLM response")
-        response = mistral.inference_llm(
-            system_prompt=system_prompt,
-            llm_query=llm_query_prompt,
-            context=reranker_list
-        )
+        with stage("llm"):
+            response = await llm_flight.do(
+                (mistral.model, RAG_PROMPT_HASH, reranker_list),
+                lambda: mistral.ainference_llm(
+                    system_prompt=system_prompt,
+                    llm_query=llm_query_prompt,
+                    context=reranker_list
+                )
+            )
         logger.info("RAG inference completed")
 
-        return RAGResponse(
+        result = RAGResponse(
             answer=response,
             context=reranker_list
         )
+        if cache_key is not None:
+            rag_cache.put(cache_key, result.model_dump())
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error during RAG inference: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    
-    
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/rag-inference/stream")
+async def rag_inference_stream(request: RAGRequest):
+    """
+    Server-sent events: `context` with the retrieved context, then `delta`
+    events with answer text, then `done` with timings (or `error`).
+    """
+    async def events():
+        started = time.perf_counter()
+        try:
+            logger.info(f"Starting streaming RAG inference for collection: {request.collection_name}")
+
+            cache_key = rag_cache_key(request)
+            cached = rag_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                logger.info("Streaming cached RAG result")
+                yield sse_event("context", {"context": cached["context"]})
+                yield sse_event("delta", {"text": cached["answer"]})
+                yield sse_event("done", {"cached": True, "total_seconds": time.perf_counter() - started})
+                return
+
+            context = await retrieve_context(request)
+            retrieval_seconds = time.perf_counter() - started
+            yield sse_event("context", {"context": context})
+
+            answer_parts = []
+            first_token_seconds = None
+            with stage("llm"):
+                async for delta in mistral.astream_llm(
+                    system_prompt=system_prompt,
+                    llm_query=llm_query_prompt,
+                    context=context
+                ):
+                    if first_token_seconds is None:
+                        first_token_seconds = time.perf_counter() - started
+                    answer_parts.append(delta)
+                    yield sse_event("delta", {"text": delta})
+
+            if cache_key is not None:
+                rag_cache.put(cache_key, RAGResponse(answer="".join(answer_parts), context=context).model_dump())
+            logger.info("Streaming RAG inference completed")
+
+            yield sse_event("done", {
+                "cached": False,
+                "retrieval_seconds": retrieval_seconds,
+                "first_token_seconds": first_token_seconds,
+                "total_seconds": time.perf_counter() - started
+            })
+        except HTTPException as e:
+            logger.warning(f"Streaming RAG inference rejected: {e.detail}")
+            yield sse_event("error", {"detail": e.detail, "status_code": e.status_code})
+        except Exception as e:
+            logger.error(f"Error during streaming RAG inference: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/collections", response_model=CollectionListResponse)
 async def list_collections():
     try:
         logger.info("Listing collections")
-        collections = qdrant_client.client.get_collections()
-        
-        stats = []
-        for collection in collections.collections:
-            try:
-                collection_info = qdrant_client.client.get_collection(collection.name)
-                vectors_count = collection_info.points_count if collection_info else 0
-            except Exception:
-                vectors_count = 0
-                
-            stats.append({
-                "name": collection.name,
-                "vectors_count": vectors_count or 0  # Ensure we always have an integer
-            })
-            
+        stats = await qdrant_client.alist_collections()
+
         logger.info(f"Found {len(stats)} collections")
         return CollectionListResponse(collections=stats)
     except Exception as e:
         logger.error(f"Error listing collections: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/stats")
+async def get_stats():
+    """Single-flight coalescing and cache counters"""
+    return {
+        "single_flight": {flight.name: flight.stats() for flight in flights},
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+        "rag_cache": rag_cache.stats() if rag_cache is not None else None,
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Stage latencies, batch sizes, errors and cache counters in Prometheus text format"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
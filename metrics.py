@@ -0,0 +1,102 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from cache.embedding_cache import embedding_cache
+from cache.rag_cache import rag_cache
+from cache.single_flight import flights
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Duration of a pipeline stage",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+STAGE_BATCH_SIZE = Histogram(
+    "rag_stage_batch_size",
+    "Items processed by one call of a pipeline stage",
+    ["stage"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+)
+STAGE_ERRORS = Counter("rag_stage_errors_total", "Pipeline stage calls that raised", ["stage"])
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Duration of an HTTP request until the response starts",
+    ["method", "route", "status"]
+)
+
+# Stage durations of the current request, for the Server-Timing header
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def start_timings() -> Dict[str, float]:
+    """Start collecting stage durations for the current request"""
+    timings: Dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(name: str, batch_size: Optional[int] = None) -> Iterator[None]:
+    """
+    Time a pipeline stage: observe its histogram, count its errors and add
+    its duration to the current request's Server-Timing entries.
+    """
+    if batch_size is not None:
+        STAGE_BATCH_SIZE.labels(name).observe(batch_size)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(name).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    """Server-Timing header value, durations in milliseconds"""
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class CacheCollector:
+    """Exports the counters the caches and single-flight groups already keep"""
+
+    def collect(self) -> Iterator:
+        calls = CounterMetricFamily("rag_single_flight_calls", "Single-flight calls", labels=["flight"])
+        coalesced = CounterMetricFamily(
+            "rag_single_flight_coalesced", "Calls that joined an in-flight computation", labels=["flight"]
+        )
+        in_flight = GaugeMetricFamily("rag_single_flight_in_flight", "Computations in flight", labels=["flight"])
+        for flight in flights:
+            stats = flight.stats()
+            calls.add_metric([flight.name], stats["calls"])
+            coalesced.add_metric([flight.name], stats["coalesced"])
+            in_flight.add_metric([flight.name], stats["in_flight"])
+        yield from (calls, coalesced, in_flight)
+
+        caches: List[tuple] = [("embedding", embedding_cache), ("rag", rag_cache)]
+        hits = CounterMetricFamily("rag_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("rag_cache_misses", "Cache misses", labels=["cache"])
+        hit_rate = GaugeMetricFamily("rag_cache_hit_ratio", "Cache hit rate since start", labels=["cache"])
+        for name, cache in caches:
+            if cache is None:
+                continue
+            stats = cache.stats()
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            hit_rate.add_metric([name], stats["hit_rate"])
+        yield from (hits, misses, hit_rate)
+
+
+REGISTRY.register(CacheCollector())
@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import os
+import re
+from glob import glob
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+from loguru import logger
+
+
+class PromptEmbeddingBank:
+    """
+    Embeddings of a fixed prompt list, computed once per embedding model and
+    kept on disk as a .npy file that is memory-mapped on load.
+
+    The file name contains the model name and a hash of the prompts, so changing
+    either one makes the old file unreachable and it is recomputed on next access.
+    """
+
+    def __init__(self, prompts: List[str], model_name: str, cache_dir: str):
+        self.prompts = list(prompts)
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self._vectors: Optional[np.ndarray] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def prompts_hash(self) -> str:
+        digest = hashlib.sha256()
+        digest.update(self.model_name.encode())
+        for prompt in self.prompts:
+            digest.update(b"\x00")
+            digest.update(prompt.encode())
+        return digest.hexdigest()[:16]
+
+    @property
+    def _model_prefix(self) -> str:
+        return "prompt_bank_" + re.sub(r"[^A-Za-z0-9_.-]", "_", self.model_name)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.cache_dir, f"{self._model_prefix}_{self.prompts_hash}.npy")
+
+    def load(self) -> Optional[np.ndarray]:
+        """Memory-map the stored embeddings if they match the current prompts and model"""
+        if self._vectors is None and os.path.exists(self.path):
+            vectors = np.load(self.path, mmap_mode="r")
+            if vectors.shape[0] == len(self.prompts):
+                self._vectors = vectors
+                logger.info(f"Loaded prompt embeddings from {self.path}")
+        return self._vectors
+
+    def save(self, vectors: List[List[float]]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Drop files of the same model built from an older prompt list
+        for stale in glob(os.path.join(self.cache_dir, f"{self._model_prefix}_{'?' * 16}.npy")):
+            if stale != self.path:
+                os.remove(stale)
+
+        tmp_path = self.path + ".tmp.npy"
+        np.save(tmp_path, np.asarray(vectors, dtype=np.float32))
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved {len(vectors)} prompt embeddings to {self.path}")
+
+    async def aget(self, embed: Callable[[List[str]], Awaitable[List[List[float]]]]) -> np.ndarray:
+        """
+        Return the prompt embeddings, computing and persisting them with `embed`
+        only when no valid file exists yet.
+        """
+        if self.load() is not None:
+            return self._vectors
+
+        async with self._lock:
+            if self.load() is None:
+                logger.info(f"Computing embeddings for {len(self.prompts)} prompts")
+                self.save(await embed(self.prompts))
+                self.load()
+        return self._vectors
@@ -1,40 +1,368 @@
 from qdrant_client import QdrantClient as SyncQdrantClient
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
+from qdrant_client.hybrid.fusion import reciprocal_rank_fusion
 from qdrant_client.models import ScoredPoint
 from loguru import logger
-from typing import List
+from typing import Dict, Iterable, List, Optional, Set
 from langsmith import traceable
-import math
+import asyncio
+import threading
+import uuid
 
 from config import CONFIG
+from executor import run_in_executor
+from cache.collection_versions import collection_versions
+from qdrant.profiles import profile_for
+from qdrant.bm25 import SPARSE_VECTOR_NAME, bm25
+from qdrant.local_engine import LocalCollection, LocalEngine
+
+# Namespace for deterministic point ids derived from chunk content
+POINT_ID_NAMESPACE = uuid.UUID("6f1c3c52-8d1e-4f4e-9a57-2b8f3a0d9c11")
+
+# Payload field partitioning the shared collection in multitenant mode
+TENANT_KEY = "tenant"
+# Upper bound on tenants returned when listing the shared collection
+MAX_TENANTS = 100_000
+
+
+def point_id(filename: str, content: str, tenant: Optional[str] = None) -> str:
+    """Stable point id: the same chunk of the same file always maps to the same point"""
+    key = f"{filename}\x00{content}" if tenant is None else f"{tenant}\x00{filename}\x00{content}"
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, key))
 
 
 class QdrantClient:
-    def __init__(self):
+    """
+    Qdrant access for logical collections (one per uploaded chat).
+
+    In "collections" storage mode every logical collection is a Qdrant collection.
+    In "multitenant" mode all of them share CONFIG.QDRANT_SHARED_COLLECTION and are
+    told apart by the indexed `tenant` payload field, which every read filters on.
+
+    SEARCH_BACKEND "local" keeps everything in the in-process exact-search engine
+    and never calls Qdrant. "auto" writes to Qdrant and mirrors collections that
+    start empty into the local engine until they exceed LOCAL_MAX_POINTS; dense
+    searches of mirrored collections are answered locally.
+    """
+
+    def __init__(self, storage_mode: Optional[str] = None):
         self.client = SyncQdrantClient(
             url=CONFIG.QDRANT_URL,
             https=False,
             port=None,
+            grpc_port=CONFIG.QDRANT_GRPC_PORT,
+            prefer_grpc=CONFIG.QDRANT_PREFER_GRPC,
         )
-        self.batch_size = 20
+        self.async_client = AsyncQdrantClient(
+            url=CONFIG.QDRANT_URL,
+            https=False,
+            port=None,
+            grpc_port=CONFIG.QDRANT_GRPC_PORT,
+            prefer_grpc=CONFIG.QDRANT_PREFER_GRPC,
+        )
+        self.batch_size = CONFIG.QDRANT_UPSERT_BATCH_SIZE
+        self.upsert_concurrency = CONFIG.QDRANT_UPSERT_CONCURRENCY
+        self.multitenant = (storage_mode or CONFIG.QDRANT_STORAGE_MODE) == "multitenant"
+        self.shared_collection = CONFIG.QDRANT_SHARED_COLLECTION
+        self.hybrid = CONFIG.HYBRID_SEARCH
+        # Known Qdrant collections and whether they store BM25 sparse vectors
+        self._known_collections: Dict[str, bool] = {}
+        # Serialize creation of the same collection by concurrent ingestion jobs
+        self._create_locks: Dict[str, asyncio.Lock] = {}
+        self._create_lock = threading.Lock()
+        self.backend = CONFIG.SEARCH_BACKEND
+        self.local = LocalEngine(CONFIG.LOCAL_INDEX_DIR) if self.backend != "qdrant" else None
+        self.local_max_points = CONFIG.LOCAL_MAX_POINTS
+        # Collections too large (or pre-existing) for the local mirror in auto mode
+        self._unmirrored: Set[str] = set()
+
+    def _collection(self, collection_name: str) -> str:
+        """Qdrant collection that stores a logical collection"""
+        return self.shared_collection if self.multitenant else collection_name
+
+    def _filter(self, collection_name: str, *conditions: models.Condition) -> Optional[models.Filter]:
+        """Filter restricting a query to a logical collection, plus extra conditions"""
+        must = list(conditions)
+        if self.multitenant:
+            must.append(models.FieldCondition(key=TENANT_KEY, match=models.MatchValue(value=collection_name)))
+        return models.Filter(must=must) if must else None
+
+    def point_id(self, collection_name: str, filename: str, content: str) -> str:
+        """Id under which a chunk of a file is stored in a logical collection"""
+        return point_id(filename, content, tenant=collection_name if self.multitenant else None)
+
+    def _build_points(
+            self,
+            collection_name: str,
+            chunks: List[str],
+            vectors: List[List[float]],
+            filename: str,
+            metadatas: Optional[List[dict]] = None
+    ) -> List[models.PointStruct]:
+        sparse = self._known_collections.get(self._collection(collection_name), False)
+        points = []
+        for i, (chunk, vector) in enumerate(zip(chunks, vectors)):
+            metadata = {
+                "filename": filename,
+                **(metadatas[i] if metadatas else {}),
+            }
+            payload = {"content": chunk, "metadata": metadata}
+            if self.multitenant:
+                payload[TENANT_KEY] = collection_name
+            points.append(models.PointStruct(
+                id=self.point_id(collection_name, filename, chunk),
+                vector=self.point_vector(vector, chunk, sparse),
+                payload=payload
+            ))
+        return points
+
+    @staticmethod
+    def point_vector(vector: List[float], content: str, sparse: bool):
+        """Dense vector, plus the BM25 sparse vector of the content for hybrid collections"""
+        if not sparse:
+            return vector
+        return {"": vector, SPARSE_VECTOR_NAME: bm25.encode_document(content)}
+
+    @staticmethod
+    def _has_sparse(info: models.CollectionInfo) -> bool:
+        return SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+
+    def _collection_params(self, collection_name: str, vector_size: int) -> dict:
+        profile = profile_for(collection_name)
+        hnsw_config = profile.hnsw_config()
+        if self.multitenant:
+            # Per-tenant HNSW graphs instead of one global graph: every search is tenant-filtered
+            hnsw_config = models.HnswConfigDiff(
+                payload_m=profile.hnsw_m or 16,
+                m=0,
+                ef_construct=profile.hnsw_ef_construct
+            )
+        return {
+            "vectors_config": profile.vectors_config(vector_size),
+            "hnsw_config": hnsw_config,
+            "quantization_config": profile.quantization_config(),
+            "on_disk_payload": profile.on_disk_payload or None,
+            "sparse_vectors_config": {
+                # Documents store BM25 term frequencies, Qdrant applies IDF at query time
+                SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)
+            } if self.hybrid else None,
+        }
+
+    def _search_params(self, collection_name: str, exact: bool) -> Optional[models.SearchParams]:
+        return profile_for(self._collection(collection_name)).search_params(exact)
+
+    def _payload_indexes(self) -> List[tuple]:
+        indexes = [("metadata.filename", models.PayloadSchemaType.KEYWORD)]
+        if self.multitenant:
+            indexes.append((TENANT_KEY, models.KeywordIndexParams(
+                type=models.KeywordIndexType.KEYWORD,
+                is_tenant=True
+            )))
+        return indexes
 
     def ensure_collection_exists(
             self,
             collection_name: str,
             vector_size: int
     ) -> None:
-        collections = self.client.get_collections()
-        collection_names = [c.name for c in collections.collections]
+        collection_name = self._collection(collection_name)
+        if collection_name in self._known_collections:
+            return
+        with self._create_lock:
+            if collection_name in self._known_collections:
+                return
+            if not self.client.collection_exists(collection_name):
+                try:
+                    self.client.create_collection(
+                        collection_name=collection_name,
+                        **self._collection_params(collection_name, vector_size)
+                    )
+                except Exception:
+                    # Created by another process in the meantime
+                    if not self.client.collection_exists(collection_name):
+                        raise
+                else:
+                    logger.info(f"Created collection: {collection_name}")
+                # Creating an existing payload index is a no-op
+                for field_name, field_schema in self._payload_indexes():
+                    self.client.create_payload_index(
+                        collection_name=collection_name,
+                        field_name=field_name,
+                        field_schema=field_schema
+                    )
+            self._known_collections[collection_name] = self._has_sparse(self.client.get_collection(collection_name))
 
-        if collection_name not in collection_names:
-            self.client.create_collection(
-                collection_name=collection_name,
-                vectors_config=models.VectorParams(
-                    size=vector_size,
-                    distance=models.Distance.COSINE
-                )
+    async def aensure_collection_exists(
+            self,
+            collection_name: str,
+            vector_size: int
+    ) -> None:
+        collection_name = self._collection(collection_name)
+        if collection_name in self._known_collections:
+            return
+        lock = self._create_locks.setdefault(collection_name, asyncio.Lock())
+        async with lock:
+            if collection_name in self._known_collections:
+                return
+            if not await self.async_client.collection_exists(collection_name):
+                try:
+                    await self.async_client.create_collection(
+                        collection_name=collection_name,
+                        **self._collection_params(collection_name, vector_size)
+                    )
+                except Exception:
+                    # Created by another process in the meantime
+                    if not await self.async_client.collection_exists(collection_name):
+                        raise
+                else:
+                    logger.info(f"Created collection: {collection_name}")
+                # Creating an existing payload index is a no-op
+                for field_name, field_schema in self._payload_indexes():
+                    await self.async_client.create_payload_index(
+                        collection_name=collection_name,
+                        field_name=field_name,
+                        field_schema=field_schema
+                    )
+            self._known_collections[collection_name] = self._has_sparse(
+                await self.async_client.get_collection(collection_name)
+            )
+
+    def forget_collection(self, collection_name: str) -> None:
+        """Drop a Qdrant collection from the known-collections cache, e.g. after it was deleted"""
+        self._known_collections.pop(collection_name, None)
+
+    def delete_collection(self, collection_name: str) -> None:
+        """Delete a Qdrant collection (by its physical name) and forget it"""
+        self.client.delete_collection(collection_name)
+        self.forget_collection(collection_name)
+
+    async def adelete_collection(self, collection_name: str) -> None:
+        """Async variant of delete_collection"""
+        await self.async_client.delete_collection(collection_name)
+        self.forget_collection(collection_name)
+
+    def _local_target(self, collection_name: str, vector_size: int, new_points: int) -> Optional[LocalCollection]:
+        """Local index an upsert goes to (besides Qdrant in auto mode), None if there is none"""
+        if self.backend == "local":
+            local = self.local.get(collection_name)
+            # A collection with no live points is empty, not missing
+            return local if local is not None else self.local.create(collection_name, vector_size)
+        if self.backend != "auto" or collection_name in self._unmirrored:
+            return None
+
+        local = self.local.get(collection_name)
+        if local is None:
+            # Mirror only collections that start empty, so the local index holds all their points
+            count = self.client.count(
+                collection_name=self._collection(collection_name),
+                count_filter=self._filter(collection_name),
+                exact=True
+            ).count
+            if count:
+                self._unmirrored.add(collection_name)
+                return None
+            local = self.local.create(collection_name, vector_size)
+        return self._check_mirror_size(collection_name, local, new_points)
+
+    async def _alocal_target(self, collection_name: str, vector_size: int, new_points: int) -> Optional[LocalCollection]:
+        """Async variant of _local_target"""
+        if self.backend != "auto" or collection_name in self._unmirrored:
+            return self._local_target(collection_name, vector_size, new_points)
+
+        local = self.local.get(collection_name)
+        if local is None:
+            count = (await self.async_client.count(
+                collection_name=self._collection(collection_name),
+                count_filter=self._filter(collection_name),
+                exact=True
+            )).count
+            if count:
+                self._unmirrored.add(collection_name)
+                return None
+            local = self.local.create(collection_name, vector_size)
+        return self._check_mirror_size(collection_name, local, new_points)
+
+    def _check_mirror_size(self, collection_name: str, local: LocalCollection, new_points: int):
+        if len(local) + new_points > self.local_max_points:
+            # From here on the collection is served by Qdrant only
+            self.local.drop(collection_name)
+            self._unmirrored.add(collection_name)
+            return None
+        return local
+
+    def _local_search(self, collection_name: str) -> Optional[LocalCollection]:
+        """Local index that answers dense searches of a collection, None to ask Qdrant"""
+        if self.backend == "qdrant" or collection_name in self._unmirrored:
+            return None
+        local = self.local.get(collection_name)
+        if self.backend == "local" or (local is not None and len(local) <= self.local_max_points):
+            return local
+        return None
+
+    def has_sparse(self, collection_name: str) -> bool:
+        """Whether a logical collection stores BM25 sparse vectors (collections created before do not)"""
+        if self.backend == "local":
+            return False
+        collection_name = self._collection(collection_name)
+        if collection_name not in self._known_collections:
+            if not self.client.collection_exists(collection_name):
+                return False
+            self._known_collections[collection_name] = self._has_sparse(self.client.get_collection(collection_name))
+        return self._known_collections[collection_name]
+
+    async def ahas_sparse(self, collection_name: str) -> bool:
+        """Whether a logical collection stores BM25 sparse vectors (collections created before do not)"""
+        if self.backend == "local":
+            return False
+        collection_name = self._collection(collection_name)
+        if collection_name not in self._known_collections:
+            if not await self.async_client.collection_exists(collection_name):
+                return False
+            self._known_collections[collection_name] = self._has_sparse(
+                await self.async_client.get_collection(collection_name)
+            )
+        return self._known_collections[collection_name]
+
+    async def aexisting_ids(self, collection_name: str, filename: str) -> Set[str]:
+        """Ids of all points stored for a file, without payloads or vectors"""
+        if self.backend == "local":
+            local = self.local.get(collection_name)
+            return local.existing_ids(filename) if local is not None else set()
+        if not await self.async_client.collection_exists(self._collection(collection_name)):
+            return set()
+
+        ids = set()
+        offset = None
+        while True:
+            points, offset = await self.async_client.scroll(
+                collection_name=self._collection(collection_name),
+                scroll_filter=self._filter(
+                    collection_name,
+                    models.FieldCondition(key="metadata.filename", match=models.MatchValue(value=filename))
+                ),
+                limit=1000,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
             )
-            logger.info(f"Created collection: {collection_name}")
+            ids.update(str(point.id) for point in points)
+            if offset is None:
+                return ids
+
+    async def adelete_points(self, collection_name: str, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        if self.backend != "local":
+            for start in range(0, len(ids), 1000):
+                await self.async_client.delete(
+                    collection_name=self._collection(collection_name),
+                    points_selector=models.PointIdsList(points=ids[start:start + 1000])
+                )
+        local = self.local.get(collection_name) if self.local is not None else None
+        if local is not None:
+            await run_in_executor(local.delete, ids)
+        collection_versions.bump(collection_name)
+        logger.info(f"Deleted {len(ids)} points from collection {collection_name}")
 
     @traceable
     def save_chunks(
@@ -45,57 +373,347 @@ class QdrantClient:
             filename: str,
 
     ) -> None:
-        self.ensure_collection_exists(
-            collection_name=collection_name,
-            vector_size=len(vectors[0])
-        )
+        if self.backend != "local":
+            self.ensure_collection_exists(
+                collection_name=collection_name,
+                vector_size=len(vectors[0])
+            )
 
-        total_chunks = len(chunks)
-        num_batches = math.ceil(total_chunks / self.batch_size)
-
-        for batch_num in range(num_batches):
-            start_idx = batch_num * self.batch_size
-            end_idx = min((batch_num + 1) * self.batch_size, total_chunks)
-
-            batch_points = []
-            for i, (chunk, vector) in enumerate(zip(
-                    chunks[start_idx:end_idx],
-                    vectors[start_idx:end_idx]
-            )):
-                metadata = {
-                    "filename": filename,
-                }
-                point_id = start_idx + i
-                batch_points.append(models.PointStruct(
-                    id=point_id,
-                    vector=vector,
-                    payload={"content": chunk,  "metadata": metadata, }
-                ))
+        points = self._build_points(collection_name, chunks, vectors, filename)
+        local = self._local_target(collection_name, len(vectors[0]), len(points))
+        if self.backend == "local":
+            local.upsert(points)
+            logger.info(f"Saved {len(points)} chunks in local collection {collection_name}")
+            collection_versions.bump(collection_name)
+            return
 
+        batches = [points[start:start + self.batch_size] for start in range(0, len(points), self.batch_size)]
+        for i, batch in enumerate(batches):
+            # Updates are applied in order, so waiting for the last batch waits for all of them
             self.client.upsert(
+                collection_name=self._collection(collection_name),
+                points=batch,
+                wait=i == len(batches) - 1
+            )
+        if local is not None:
+            local.upsert(points)
+
+        logger.info(f"Saved {len(points)} chunks in {len(batches)} batches in collection {collection_name}")
+        collection_versions.bump(collection_name)
+
+    @traceable
+    async def asave_chunks(
+            self,
+            collection_name: str,
+            chunks: List[str],
+            vectors: List[List[float]],
+            filename: str,
+            metadatas: Optional[List[dict]] = None,
+            wait: bool = True
+    ) -> None:
+        """
+        Upsert chunks in QDRANT_UPSERT_BATCH_SIZE batches.
+
+        With wait=True the last batch waits until all are applied and the
+        collection version is bumped. With wait=False Qdrant only acknowledges
+        the batches: the caller makes a later write with wait=True as the barrier
+        (updates of a collection are applied in order).
+        """
+        if self.backend != "local":
+            await self.aensure_collection_exists(
                 collection_name=collection_name,
-                points=batch_points
+                vector_size=len(vectors[0])
             )
 
-            logger.info(
-                f"Saved batch {batch_num + 1}/{num_batches} "
-                f"({len(batch_points)} chunks) in collection {collection_name}"
+        points = self._build_points(collection_name, chunks, vectors, filename, metadatas)
+        local = await self._alocal_target(collection_name, len(vectors[0]), len(points))
+        if self.backend == "local":
+            await run_in_executor(local.upsert, points)
+            logger.info(f"Saved {len(points)} chunks in local collection {collection_name}")
+            collection_versions.bump(collection_name)
+            return
+
+        batches = [points[start:start + self.batch_size] for start in range(0, len(points), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.upsert_concurrency)
+
+        async def upsert_no_wait(batch: List[models.PointStruct]) -> None:
+            async with semaphore:
+                await self.async_client.upsert(
+                    collection_name=self._collection(collection_name),
+                    points=batch,
+                    wait=False
+                )
+
+        # All but the last batch go out concurrently without waiting for indexing
+        await asyncio.gather(*(upsert_no_wait(batch) for batch in (batches[:-1] if wait else batches)))
+        if wait:
+            # Updates are applied in order, so waiting for the last batch waits for all of them
+            await self.async_client.upsert(
+                collection_name=self._collection(collection_name),
+                points=batches[-1],
+                wait=True
             )
+        if local is not None:
+            await run_in_executor(local.upsert, points)
+
+        logger.info(f"Saved {len(points)} chunks in {len(batches)} batches in collection {collection_name}")
+        if wait:
+            collection_versions.bump(collection_name)
 
     @traceable
     def search_by_vector(
             self,
             collection_name: str,
             query_vector: List[float],
-            limit: int = 10
+            limit: int = 10,
+            exact: bool = False
     ) -> List[ScoredPoint]:
         """Search vectors with basic filtering"""
+        local = self._local_search(collection_name)
+        if local is not None or self.backend == "local":
+            return self._search_local(local, [query_vector], limit, False)[0]
         results = self.client.search(
-            collection_name=collection_name,
+            collection_name=self._collection(collection_name),
+            query_vector=query_vector,
+            query_filter=self._filter(collection_name),
+            search_params=self._search_params(collection_name, exact),
+            limit=limit
+        )
+        return results
+
+    @traceable
+    async def asearch_by_vector(
+            self,
+            collection_name: str,
+            query_vector: List[float],
+            limit: int = 10,
+            exact: bool = False
+    ) -> List[ScoredPoint]:
+        """Async search vectors with basic filtering"""
+        local = self._local_search(collection_name)
+        if local is not None or self.backend == "local":
+            return (await run_in_executor(self._search_local, local, [query_vector], limit, False))[0]
+        results = await self.async_client.search(
+            collection_name=self._collection(collection_name),
             query_vector=query_vector,
+            query_filter=self._filter(collection_name),
+            search_params=self._search_params(collection_name, exact),
             limit=limit
         )
         return results
 
+    def _search_requests(
+            self,
+            collection_name: str,
+            query_vectors: List[List[float]],
+            limit: int,
+            exact: bool = False,
+            with_vectors: bool = False
+    ) -> List[models.SearchRequest]:
+        query_filter = self._filter(collection_name)
+        params = self._search_params(collection_name, exact)
+        return [
+            models.SearchRequest(
+                vector=vector,
+                filter=query_filter,
+                params=params,
+                limit=limit,
+                with_payload=True,
+                with_vector=with_vectors
+            )
+            for vector in query_vectors
+        ]
+
+    @traceable
+    def search_batch(
+            self,
+            collection_name: str,
+            query_vectors: List[List[float]],
+            limit: int = 10,
+            exact: bool = False,
+            with_vectors: bool = False
+    ) -> List[List[ScoredPoint]]:
+        """Search several query vectors in one round trip, results grouped per query"""
+        local = self._local_search(collection_name)
+        if local is not None or self.backend == "local":
+            return self._search_local(local, query_vectors, limit, with_vectors)
+        return self.client.search_batch(
+            collection_name=self._collection(collection_name),
+            requests=self._search_requests(collection_name, query_vectors, limit, exact, with_vectors)
+        )
+
+    @traceable
+    async def asearch_batch(
+            self,
+            collection_name: str,
+            query_vectors: List[List[float]],
+            limit: int = 10,
+            exact: bool = False,
+            with_vectors: bool = False
+    ) -> List[List[ScoredPoint]]:
+        """Async search of several query vectors in one round trip, results grouped per query"""
+        local = self._local_search(collection_name)
+        if local is not None or self.backend == "local":
+            return await run_in_executor(self._search_local, local, query_vectors, limit, with_vectors)
+        return await self.async_client.search_batch(
+            collection_name=self._collection(collection_name),
+            requests=self._search_requests(collection_name, query_vectors, limit, exact, with_vectors)
+        )
+
+    @staticmethod
+    def _search_local(
+            local: Optional[LocalCollection],
+            query_vectors: List[List[float]],
+            limit: int,
+            with_vectors: bool
+    ) -> List[List[ScoredPoint]]:
+        if local is None:
+            return [[] for _ in query_vectors]
+        return local.search_batch(query_vectors, limit, with_vectors)
+
+    def _hybrid_requests(
+            self,
+            collection_name: str,
+            query_vectors: List[List[float]],
+            query_texts: List[str],
+            limit: int,
+            exact: bool = False,
+            with_vectors: bool = False
+    ) -> List[models.QueryRequest]:
+        query_filter = self._filter(collection_name)
+        params = self._search_params(collection_name, exact)
+        prefetch_limit = limit * CONFIG.HYBRID_PREFETCH_FACTOR
+        requests = []
+        for vector, text in zip(query_vectors, query_texts):
+            prefetch = [models.Prefetch(query=vector, filter=query_filter, params=params, limit=prefetch_limit)]
+            sparse_query = bm25.encode_query(text)
+            if sparse_query.indices:
+                prefetch.append(models.Prefetch(
+                    query=sparse_query,
+                    using=SPARSE_VECTOR_NAME,
+                    filter=query_filter,
+                    limit=prefetch_limit
+                ))
+            requests.append(models.QueryRequest(
+                prefetch=prefetch,
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                limit=limit,
+                offset=0,
+                with_payload=True,
+                with_vector=with_vectors
+            ))
+        return requests
+
+    @traceable
+    async def ahybrid_search_batch(
+            self,
+            collection_name: str,
+            query_vectors: List[List[float]],
+            query_texts: List[str],
+            limit: int = 10,
+            exact: bool = False,
+            with_vectors: bool = False
+    ) -> List[List[ScoredPoint]]:
+        """
+        Dense and BM25 search fused with RRF in one round trip, results grouped per query.
+        Collections without sparse vectors fall back to dense search.
+        """
+        if not await self.ahas_sparse(collection_name):
+            return await self.asearch_batch(collection_name, query_vectors, limit, exact, with_vectors)
+
+        local = self._local_search(collection_name)
+        if local is not None:
+            return await self._ahybrid_search_mirrored(
+                collection_name, local, query_vectors, query_texts, limit, with_vectors
+            )
+
+        responses = await self.async_client.query_batch_points(
+            collection_name=self._collection(collection_name),
+            requests=self._hybrid_requests(collection_name, query_vectors, query_texts, limit, exact, with_vectors)
+        )
+        return [response.points for response in responses]
+
+    async def _ahybrid_search_mirrored(
+            self,
+            collection_name: str,
+            local: LocalCollection,
+            query_vectors: List[List[float]],
+            query_texts: List[str],
+            limit: int,
+            with_vectors: bool
+    ) -> List[List[ScoredPoint]]:
+        """
+        Hybrid search of a mirrored collection: the dense half is answered by the
+        local index, only the BM25 half goes to Qdrant, and both are fused with
+        the same RRF Qdrant applies server-side.
+        """
+        prefetch_limit = limit * CONFIG.HYBRID_PREFETCH_FACTOR
+        sparse_queries = [bm25.encode_query(text) for text in query_texts]
+        asked = [i for i, query in enumerate(sparse_queries) if query.indices]
+
+        async def search_sparse() -> List[List[ScoredPoint]]:
+            sparse: List[List[ScoredPoint]] = [[] for _ in query_texts]
+            if not asked:
+                return sparse
+            responses = await self.async_client.query_batch_points(
+                collection_name=self._collection(collection_name),
+                requests=[
+                    models.QueryRequest(
+                        query=sparse_queries[i],
+                        using=SPARSE_VECTOR_NAME,
+                        filter=self._filter(collection_name),
+                        limit=prefetch_limit,
+                        offset=0,
+                        with_payload=True,
+                        with_vector=with_vectors
+                    )
+                    for i in asked
+                ]
+            )
+            for i, response in zip(asked, responses):
+                sparse[i] = response.points
+            return sparse
+
+        # The local dense search runs in the executor while the BM25 query is in flight
+        dense, sparse = await asyncio.gather(
+            run_in_executor(local.search_batch, query_vectors, prefetch_limit, with_vectors),
+            search_sparse()
+        )
+        return [reciprocal_rank_fusion([dense[i], sparse[i]], limit) for i in range(len(query_texts))]
+
+    async def alist_collections(self) -> List[dict]:
+        """Names and point counts of all collections"""
+        if self.backend == "local":
+            return [{"name": name, "vectors_count": len(self.local.get(name))} for name in self.local.names()]
+        if self.multitenant:
+            return await self._alist_tenants()
+
+        collections = await self.async_client.get_collections()
+
+        stats = []
+        for collection in collections.collections:
+            try:
+                collection_info = await self.async_client.get_collection(collection.name)
+                vectors_count = collection_info.points_count if collection_info else 0
+            except Exception:
+                vectors_count = 0
+
+            stats.append({
+                "name": collection.name,
+                "vectors_count": vectors_count or 0  # Ensure we always have an integer
+            })
+        return stats
+
+    async def _alist_tenants(self) -> List[dict]:
+        """Logical collections of the shared collection, counted from the tenant index"""
+        if not await self.async_client.collection_exists(self.shared_collection):
+            return []
+        facets = await self.async_client.facet(
+            collection_name=self.shared_collection,
+            key=TENANT_KEY,
+            limit=MAX_TENANTS
+        )
+        return [{"name": hit.value, "vectors_count": hit.count} for hit in facets.hits]
+
 
 qdrant_client = QdrantClient()
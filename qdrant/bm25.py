@@ -0,0 +1,98 @@
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+from qdrant_client.http import models
+
+# Name of the sparse vector holding BM25 term weights
+SPARSE_VECTOR_NAME = "bm25"
+
+WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+RU_STOPWORDS = frozenset("""
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было вот
+от меня еще нет о из ему теперь когда даже ну вдруг ли если уже или ни быть был него до вас нибудь
+опять уж вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их чем была
+сам чтоб без будто чего раз тоже себе под будет ж тогда кто этот того потому этого какой совсем ним
+здесь этом один почти мой тем чтобы нее сейчас были куда зачем всех никогда можно при наконец два
+об другой хоть после над больше тот через эти нас про всего них какая много разве три эту моя
+впрочем хорошо свою этой перед иногда лучше чуть том нельзя такой им более всегда конечно всю между
+это так вот ага угу ок
+""".split())
+
+EN_STOPWORDS = frozenset("""
+a an the and or but if of to in on at by for with from as is are was were be been it its this that
+i you he she we they me my your our their not no do does did have has had so just ok
+""".split())
+
+# Russian inflectional endings, longest first; enough to merge "ссора/ссоры/ссорой"
+RU_ENDINGS = sorted("""
+иями ями ами ией иям ием иях остью ости ость ениями ениях ениям ения ение ений
+ивший ывший ующий ющий ящий ащий ились ались ился илась ться ить ать ять еть ыть ует уют
+ия ию ии ого его ому ему ыми ими ая яя ое ее ые ие ый ий ой ей
+ом ем ам ям ах ях ую юю ть ешь ет ют ут ит ат ят им ишь ил ила ило или ел ела ели ал ала али
+ся сь а я о е ы и у ю ь
+""".split(), key=len, reverse=True)
+
+MIN_STEM_LENGTH = 3
+
+
+def stem(word: str) -> str:
+    """Light suffix stripping; Latin words are left as is"""
+    if not ("а" <= word[0] <= "я"):
+        return word
+    for ending in RU_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed words without stop words and numbers"""
+    tokens = []
+    for word in WORD_RE.findall(text.lower().replace("ё", "е")):
+        if len(word) < 2 or word in RU_STOPWORDS or word in EN_STOPWORDS:
+            continue
+        tokens.append(stem(word))
+    return tokens
+
+
+def term_index(term: str) -> int:
+    """Hashed sparse index of a term, stable across processes"""
+    return zlib.crc32(term.encode("utf-8"))
+
+
+class BM25Encoder:
+    """
+    Sparse BM25 vectors computed locally.
+
+    Documents carry the saturated term frequency part of BM25; the IDF part is
+    applied by Qdrant at query time (sparse vector with Modifier.IDF), so the
+    vectors do not depend on the rest of the collection.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_length: float = 150.0):
+        self.k1 = k1
+        self.b = b
+        self.avg_length = avg_length
+
+    @staticmethod
+    def _sparse(weights: Dict[int, float]) -> models.SparseVector:
+        indices = sorted(weights)
+        return models.SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        tokens = tokenize(text)
+        norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_length)
+        weights: Dict[int, float] = {}
+        for term, tf in Counter(tokens).items():
+            index = term_index(term)
+            weights[index] = weights.get(index, 0.0) + tf * (self.k1 + 1) / (tf + norm)
+        return self._sparse(weights)
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        return self._sparse({term_index(term): 1.0 for term in set(tokenize(text))})
+
+
+bm25 = BM25Encoder()
@@ -0,0 +1,284 @@
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import quote, unquote
+
+import numpy as np
+from loguru import logger
+from qdrant_client.http import models
+from qdrant_client.models import ScoredPoint
+
+# Tombstoned rows are compacted away once they outnumber live rows by this many
+COMPACT_MIN_DEAD = 1000
+
+# Suffixes of the directories of an in-progress compaction. quote() always
+# escapes "#", so they cannot clash with a collection directory.
+COMPACT_SUFFIX = "#compact"
+OLD_SUFFIX = "#old"
+
+
+def _dense(vector) -> List[float]:
+    # Hybrid points carry {"": dense, "bm25": sparse}
+    return vector[""] if isinstance(vector, dict) else vector
+
+
+class LocalCollection:
+    """
+    Append-only exact-search index of one collection.
+
+    Files in the collection directory:
+        meta.json      vector dimension
+        vectors.f32    normalized float32 rows, memory-mapped for search
+        payloads.jsonl payloads, one JSON document per row
+        offsets.i64    start offset of each row in payloads.jsonl, memory-mapped
+        alive.u8       tombstone mask: 0 for deleted or overwritten rows
+        index.jsonl    point id and filename of each row; appended last, so it defines the row count
+
+    Upserts append rows and tombstone older versions of the same ids; deletes
+    only tombstone. Once tombstoned rows outnumber live ones (and COMPACT_MIN_DEAD),
+    either operation rewrites the collection without them. Search is one
+    matrix product over all rows.
+
+    Rows past index.jsonl left by an interrupted upsert are truncated on open;
+    an interrupted compaction is finished or rolled back by recover().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        with open(self._file("meta.json")) as f:
+            meta = json.load(f)
+        self.dim: int = meta["dim"]
+
+        self.ids: List[str] = []
+        self.filenames: List[str] = []
+        committed = 0
+        with open(self._file("index.jsonl"), "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                row = json.loads(line)
+                self.ids.append(row["id"])
+                self.filenames.append(row["filename"])
+                committed += len(line)
+        self._truncate("index.jsonl", committed)
+        self._drop_uncommitted_rows()
+        self._load()
+
+    @classmethod
+    def create(cls, path: str, dim: int) -> "LocalCollection":
+        os.makedirs(path, exist_ok=True)
+        for name in ("vectors.f32", "payloads.jsonl", "offsets.i64", "alive.u8", "index.jsonl"):
+            open(os.path.join(path, name), "wb").close()
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"dim": dim}, f)
+        return cls(path)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _truncate(self, name: str, size: int) -> None:
+        if os.path.getsize(self._file(name)) > size:
+            logger.warning(f"Truncating uncommitted data of {self._file(name)} to {size} bytes")
+            os.truncate(self._file(name), size)
+
+    def _drop_uncommitted_rows(self) -> None:
+        """Cut every row file to the rows listed in index.jsonl"""
+        n = len(self.ids)
+        self._truncate("vectors.f32", n * self.dim * np.dtype(np.float32).itemsize)
+        self._truncate("offsets.i64", n * np.dtype(np.int64).itemsize)
+        self._truncate("alive.u8", n)
+
+        payloads_end = 0
+        if n:
+            last = int(np.fromfile(self._file("offsets.i64"), dtype=np.int64, count=n)[-1])
+            with open(self._file("payloads.jsonl"), "rb") as f:
+                f.seek(last)
+                payloads_end = last + len(f.readline())
+        self._truncate("payloads.jsonl", payloads_end)
+
+    def _load(self) -> None:
+        """(Re)map the row files, trimmed to the committed row count"""
+        n = len(self.ids)
+        self.vectors = self._map("vectors.f32", np.float32, (n, self.dim))
+        self.offsets = self._map("offsets.i64", np.int64, (n,))
+        self.alive = np.fromfile(self._file("alive.u8"), dtype=np.bool_, count=n)
+        self.payloads = self._map("payloads.jsonl", np.uint8, (os.path.getsize(self._file("payloads.jsonl")),))
+        self.row_of: Dict[str, int] = {point_id: row for row, point_id in enumerate(self.ids) if self.alive[row]}
+
+    def _map(self, name: str, dtype, shape: tuple) -> np.ndarray:
+        if not np.prod(shape):
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode="r", shape=shape)
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    def _tombstone(self, rows: Iterable[int]) -> None:
+        with open(self._file("alive.u8"), "r+b") as f:
+            for row in rows:
+                self.alive[row] = False
+                f.seek(row)
+                f.write(b"\x00")
+
+    def upsert(self, points: List[models.PointStruct]) -> None:
+        if not points:
+            return
+        with self.lock:
+            vectors = np.asarray([_dense(point.vector) for point in points], dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+
+            replaced = [self.row_of[str(point.id)] for point in points if str(point.id) in self.row_of]
+            self._tombstone(replaced)
+
+            position = os.path.getsize(self._file("payloads.jsonl"))
+            offsets = []
+            with open(self._file("payloads.jsonl"), "ab") as f:
+                for point in points:
+                    data = json.dumps(point.payload, ensure_ascii=False).encode("utf-8") + b"\n"
+                    offsets.append(position)
+                    position += len(data)
+                    f.write(data)
+            with open(self._file("vectors.f32"), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._file("offsets.i64"), "ab") as f:
+                f.write(np.asarray(offsets, dtype=np.int64).tobytes())
+            with open(self._file("alive.u8"), "ab") as f:
+                f.write(b"\x01" * len(points))
+            with open(self._file("index.jsonl"), "a", encoding="utf-8") as f:
+                for point in points:
+                    filename = (point.payload or {}).get("metadata", {}).get("filename", "")
+                    f.write(json.dumps({"id": str(point.id), "filename": filename}, ensure_ascii=False) + "\n")
+                    self.ids.append(str(point.id))
+                    self.filenames.append(filename)
+            self._load()
+            self._compact_if_needed()
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self.lock:
+            rows = [self.row_of[point_id] for point_id in ids if point_id in self.row_of]
+            self._tombstone(rows)
+            self._load()
+            self._compact_if_needed()
+
+    def _compact_if_needed(self) -> None:
+        if len(self.ids) - len(self) > max(COMPACT_MIN_DEAD, len(self)):
+            self._compact()
+
+    def _compact(self) -> None:
+        rows = np.flatnonzero(self.alive)
+        points = [
+            models.PointStruct(id=self.ids[row], vector=self.vectors[row].tolist(), payload=self._payload(row))
+            for row in rows
+        ]
+        shutil.rmtree(self.path + COMPACT_SUFFIX, ignore_errors=True)
+        fresh = LocalCollection.create(self.path + COMPACT_SUFFIX, self.dim)
+        fresh.upsert(points)
+        # Every step leaves a complete copy on disk for recover()
+        os.rename(self.path, self.path + OLD_SUFFIX)
+        os.rename(fresh.path, self.path)
+        shutil.rmtree(self.path + OLD_SUFFIX)
+        self.ids, self.filenames = fresh.ids, fresh.filenames
+        self._load()
+        logger.info(f"Compacted local index {self.path}: {len(rows)} rows")
+
+    @staticmethod
+    def recover(path: str) -> None:
+        """Finish or roll back a compaction of the collection at path interrupted by a crash"""
+        compact, old = path + COMPACT_SUFFIX, path + OLD_SUFFIX
+        if not os.path.exists(path) and os.path.exists(old):
+            # Interrupted between the two renames: the compacted copy is complete
+            if os.path.exists(compact):
+                os.rename(compact, path)
+            else:
+                os.rename(old, path)
+            logger.warning(f"Recovered interrupted compaction of local index {path}")
+        # A leftover compacted copy may be partial; the old copy is superseded
+        shutil.rmtree(compact, ignore_errors=True)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def _payload(self, row: int) -> dict:
+        start = int(self.offsets[row])
+        end = int(self.offsets[row + 1]) if row + 1 < len(self.offsets) else len(self.payloads)
+        return json.loads(bytes(self.payloads[start:end]))
+
+    def existing_ids(self, filename: str) -> Set[str]:
+        return {self.ids[row] for row in self.row_of.values() if self.filenames[row] == filename}
+
+    def search_batch(
+            self,
+            query_vectors: List[List[float]],
+            limit: int,
+            with_vectors: bool = False
+    ) -> List[List[ScoredPoint]]:
+        """Exact cosine search of several queries with one matrix product"""
+        with self.lock:
+            queries = np.asarray(query_vectors, dtype=np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12
+            k = min(limit, len(self))
+            if k == 0:
+                return [[] for _ in query_vectors]
+
+            scores = self.vectors @ queries.T
+            scores[~self.alive] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=0)[:k]
+
+            results = []
+            for j in range(queries.shape[0]):
+                rows = top[:, j][np.argsort(-scores[top[:, j], j])]
+                results.append([
+                    ScoredPoint(
+                        id=self.ids[row],
+                        version=0,
+                        score=float(scores[row, j]),
+                        payload=self._payload(row),
+                        vector=self.vectors[row].tolist() if with_vectors else None
+                    )
+                    for row in rows
+                ])
+            return results
+
+
+class LocalEngine:
+    """In-process exact search over memory-mapped per-collection indexes"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._collections: Dict[str, LocalCollection] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        for name in os.listdir(root):
+            for suffix in (COMPACT_SUFFIX, OLD_SUFFIX):
+                if name.endswith(suffix):
+                    LocalCollection.recover(os.path.join(root, name[:-len(suffix)]))
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.root, quote(collection_name, safe=""))
+
+    def get(self, collection_name: str) -> Optional[LocalCollection]:
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None and os.path.exists(os.path.join(self._path(collection_name), "meta.json")):
+                collection = self._collections[collection_name] = LocalCollection(self._path(collection_name))
+            return collection
+
+    def create(self, collection_name: str, dim: int) -> LocalCollection:
+        with self._lock:
+            collection = LocalCollection.create(self._path(collection_name), dim)
+            self._collections[collection_name] = collection
+            logger.info(f"Created local index: {collection_name}")
+            return collection
+
+    def drop(self, collection_name: str) -> None:
+        with self._lock:
+            self._collections.pop(collection_name, None)
+            shutil.rmtree(self._path(collection_name), ignore_errors=True)
+            logger.info(f"Dropped local index: {collection_name}")
+
+    def names(self) -> List[str]:
+        return sorted(
+            unquote(name) for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, "meta.json"))
+        )
@@ -0,0 +1,86 @@
+import argparse
+from typing import List
+
+from loguru import logger
+from qdrant_client.http import models
+
+from cache.collection_versions import collection_versions
+from qdrant.QdrantClient import TENANT_KEY, QdrantClient
+
+
+def migrate_collection(store: QdrantClient, collection_name: str, batch_size: int, delete_source: bool) -> int:
+    """Copy one per-chat collection into the shared collection as tenant `collection_name`"""
+    moved = 0
+    offset = None
+    while True:
+        points, offset = store.client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        if points:
+            store.ensure_collection_exists(collection_name, vector_size=len(_dense_vector(points[0])))
+            store.client.upsert(
+                collection_name=store.shared_collection,
+                points=[_tenant_point(store, collection_name, point) for point in points]
+            )
+            moved += len(points)
+            logger.info(f"{collection_name}: moved {moved} points")
+        if offset is None:
+            break
+
+    collection_versions.bump(collection_name)
+    if delete_source:
+        store.delete_collection(collection_name)
+        logger.info(f"Deleted source collection {collection_name}")
+    return moved
+
+
+def _dense_vector(point: models.Record) -> List[float]:
+    # Hybrid collections return {"": dense, "bm25": sparse}
+    return point.vector[""] if isinstance(point.vector, dict) else point.vector
+
+
+def _tenant_point(store: QdrantClient, collection_name: str, point: models.Record) -> models.PointStruct:
+    payload = dict(point.payload or {})
+    payload[TENANT_KEY] = collection_name
+    content = payload.get("content")
+    filename = payload.get("metadata", {}).get("filename")
+    vector = _dense_vector(point)
+    # Re-derive the id with the tenant so equal chunks of different chats do not collide
+    if content is not None and filename is not None:
+        new_id = store.point_id(collection_name, filename, content)
+        vector = store.point_vector(vector, content, store.has_sparse(collection_name))
+    else:
+        new_id = str(point.id)
+    return models.PointStruct(id=new_id, vector=vector, payload=payload)
+
+
+def main(argv: List[str] = None):
+    """
+    Moves per-chat collections into the shared multitenant collection.
+
+    Run from the repository root: python -m qdrant.migrate_to_multitenant [collection ...]
+    Without arguments every collection except the shared one is migrated.
+    Set QDRANT_STORAGE_MODE=multitenant for the API afterwards.
+    """
+    parser = argparse.ArgumentParser(description="Move per-chat collections into the shared multitenant collection")
+    parser.add_argument("collections", nargs="*", help="Collections to migrate (default: all)")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--delete-source", action="store_true", help="Drop each source collection after copying")
+    args = parser.parse_args(argv)
+
+    store = QdrantClient(storage_mode="multitenant")
+    names = args.collections or [
+        c.name for c in store.client.get_collections().collections
+        if c.name != store.shared_collection
+    ]
+    for name in names:
+        moved = migrate_collection(store, name, args.batch_size, args.delete_source)
+        logger.info(f"Migrated {name}: {moved} points into {store.shared_collection}")
+
+
+if __name__ == "__main__":
+    main()
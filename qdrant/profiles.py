@@ -0,0 +1,122 @@
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+from qdrant_client.http import models
+
+from config import CONFIG
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """
+    Storage and index settings applied when a collection is created.
+
+    quantization: None (float32 only), "scalar" (int8, ~4x less RAM) or
+    "binary" (1 bit per dimension, ~32x less RAM). Quantized vectors stay in RAM
+    for the HNSW walk; the top `limit * oversampling` candidates are rescored
+    with the original vectors, which then may live on disk.
+    """
+    quantization: Optional[str] = None
+    on_disk_vectors: bool = False
+    on_disk_payload: bool = False
+    hnsw_m: Optional[int] = None
+    hnsw_ef_construct: Optional[int] = None
+    hnsw_ef: Optional[int] = None
+    rescore: bool = True
+    oversampling: Optional[float] = None
+
+    def vectors_config(self, vector_size: int) -> models.VectorParams:
+        return models.VectorParams(
+            size=vector_size,
+            distance=models.Distance.COSINE,
+            on_disk=self.on_disk_vectors or None
+        )
+
+    def hnsw_config(self) -> Optional[models.HnswConfigDiff]:
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(self) -> Optional[models.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True
+            ))
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def search_params(self, exact: bool = False) -> Optional[models.SearchParams]:
+        """Query-time parameters; None keeps the server defaults"""
+        if not exact and self.hnsw_ef is None and self.quantization is None:
+            return None
+        return models.SearchParams(
+            hnsw_ef=self.hnsw_ef,
+            exact=exact,
+            quantization=models.QuantizationSearchParams(
+                rescore=self.rescore,
+                oversampling=self.oversampling
+            ) if self.quantization else None
+        )
+
+
+PROFILES: Dict[str, CollectionProfile] = {
+    # Plain float32 vectors and payloads in RAM, server default HNSW
+    "default": CollectionProfile(),
+    # int8 vectors in RAM, originals and payloads on disk
+    "scalar": CollectionProfile(
+        quantization="scalar",
+        on_disk_vectors=True,
+        on_disk_payload=True,
+        hnsw_m=16,
+        hnsw_ef_construct=100,
+        hnsw_ef=128,
+        oversampling=2.0
+    ),
+    # 1-bit vectors in RAM; for high-dimensional embeddings such as mistral-embed (1024)
+    "binary": CollectionProfile(
+        quantization="binary",
+        on_disk_vectors=True,
+        on_disk_payload=True,
+        hnsw_m=16,
+        hnsw_ef_construct=100,
+        hnsw_ef=128,
+        oversampling=3.0
+    ),
+}
+
+
+# Keys of QDRANT_COLLECTION_HNSW entries and the profile fields they set
+HNSW_OVERRIDES = {"m": "hnsw_m", "ef_construct": "hnsw_ef_construct", "ef": "hnsw_ef"}
+
+
+def hnsw_overrides(collection_name: str) -> Dict[str, int]:
+    """HNSW settings from Settings: global values, then per-collection ones"""
+    overrides = {
+        field: value for field, value in (
+            ("hnsw_m", CONFIG.QDRANT_HNSW_M),
+            ("hnsw_ef_construct", CONFIG.QDRANT_HNSW_EF_CONSTRUCT),
+            ("hnsw_ef", CONFIG.QDRANT_HNSW_EF),
+        ) if value is not None
+    }
+    for key, value in CONFIG.QDRANT_COLLECTION_HNSW.get(collection_name, {}).items():
+        if key not in HNSW_OVERRIDES:
+            raise ValueError(
+                f"Unknown HNSW setting '{key}' for {collection_name}, expected one of {sorted(HNSW_OVERRIDES)}"
+            )
+        overrides[HNSW_OVERRIDES[key]] = value
+    return overrides
+
+
+def profile_for(collection_name: str) -> CollectionProfile:
+    """
+    Profile of a Qdrant collection: per-collection mapping first, then the global
+    default, with HNSW settings from Settings applied on top
+    """
+    name = CONFIG.QDRANT_COLLECTION_PROFILES.get(collection_name, CONFIG.QDRANT_PROFILE)
+    if name not in PROFILES:
+        raise ValueError(f"Unknown collection profile '{name}', expected one of {sorted(PROFILES)}")
+    overrides = hnsw_overrides(collection_name)
+    return replace(PROFILES[name], **overrides) if overrides else PROFILES[name]
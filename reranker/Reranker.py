@@ -1,47 +1,172 @@
-from sentence_transformers import CrossEncoder
-from typing import List
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from config import CONFIG
+from executor import run_inference, run_inference_sync
+from reranker.engine import init_worker, load_cross_encoder, predict_bucketed, worker_predict
+
 
 class Reranker:
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    def __init__(self,
+                 model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+                 batch_size: int = 32,
+                 engine: str = "torch",
+                 threads: int = 0,
+                 workers: int = 0,
+                 max_batch_tokens: int = 8192):
         """
         Инициализация реранкера.
 
+        При workers == 0 модель загружается один раз на весь процесс, а скоринг
+        идёт в общем потоке инференса (executor.inference_executor) вместе с
+        локальным эмбеддером. Иначе запросы скорятся в пуле из workers процессов,
+        каждый со своей копией модели; пул создаётся один раз при первом вызове.
+
         :param model_name: Имя модели CrossEncoder.
+        :param batch_size: Максимум пар в батче predict.
+        :param engine: Движок инференса: "torch" (fp32) или "int8" (динамическая квантизация).
+        :param threads: Потоки torch на процесс пула (0 — по умолчанию torch); в текущем
+                        процессе потоки задаёт CONFIG.LOCAL_INFERENCE_THREADS.
+        :param workers: Размер пула процессов (0 — скоринг в текущем процессе).
+        :param max_batch_tokens: Максимум токенов в батче с учётом паддинга.
         """
         self.model_name = model_name
-        self.reranker = CrossEncoder(model_name)
+        self.batch_size = batch_size
+        self.engine = engine
+        self.threads = threads
+        self.workers = workers
+        self.max_batch_tokens = max_batch_tokens
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self.reranker = None if workers > 0 else load_cross_encoder(model_name, engine)
 
-    def rerank(self, query: str, results: list) -> str:
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                logger.info(f"Starting reranker pool: {self.workers} processes, engine {self.engine}")
+                # spawn: fork после инициализации torch может зависнуть на его потоках
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                    initargs=(self.model_name, self.engine, self.threads)
+                )
+            return self._pool
+
+    def predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
         """
-        Реранкинг списка кандидатов.
+        Скоры пар (запрос, кандидат) в исходном порядке.
 
-        :param query: Запрос пользователя.
-        :param results: Список результатов из Qdrant (list of dict),
-                        где каждый элемент должен содержать ключ 'content'.
-        :return: str
+        Пары сортируются по длине и бьются на бакеты; при наличии пула весь
+        запрос уходит в один процесс, так что независимые запросы
+        выполняются параллельно на разных ядрах.
+
+        :param pairs: Пары (запрос, кандидат).
+        :return: np.ndarray
         """
-        merge_best = ''
-        for i in range(len(results)):
-            candidates = [
-                (query[i], result)  # Преобразуем в строку
-                for result in results[i]
-            ]
+        if self.workers > 0:
+            return self._get_pool().submit(worker_predict, pairs, self.batch_size, self.max_batch_tokens).result()
+        return run_inference_sync(predict_bucketed, self.reranker, pairs, self.batch_size, self.max_batch_tokens)
 
-            # Инициализация реранкера
-            reranker = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")  # Пример модели для реранка
+    async def apredict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """
+        Асинхронный predict: при наличии пула запрос ожидается прямо на пуле
+        процессов, поэтому одновременно скорятся до workers запросов; без пула
+        запросы по одному выполняются в потоке инференса.
 
-            # Оценка релевантности с помощью реранкера
-            scores = reranker.predict(candidates)
+        :param pairs: Пары (запрос, кандидат).
+        :return: np.ndarray
+        """
+        if self.workers > 0:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_pool(), worker_predict, pairs, self.batch_size, self.max_batch_tokens
+            )
+        return await run_inference(predict_bucketed, self.reranker, pairs, self.batch_size, self.max_batch_tokens)
 
-            # Объединение результатов с оценками
-            scored_results = [
-                {"content": result, "score": score}
-                for result, score in zip(results[i], scores)
+    def close(self) -> None:
+        """Остановка пула процессов."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    @staticmethod
+    def _pairs(queries: List[str], results: List[List[str]]) -> List[Tuple[str, str]]:
+        return [
+            (queries[i], candidate)
+            for i in range(len(results))
+            for candidate in results[i]
+        ]
+
+    @staticmethod
+    def _group(results: List[List[str]], scores: np.ndarray) -> List[List[Dict]]:
+        """Раскладывает скоры плоского списка пар обратно по запросам."""
+        scored_results = []
+        offset = 0
+        for candidates in results:
+            scored = [
+                {"content": candidate, "score": float(score), "index": index}
+                for index, (candidate, score) in enumerate(zip(candidates, scores[offset:offset + len(candidates)]))
             ]
+            offset += len(candidates)
+            scored_results.append(sorted(scored, key=lambda x: x['score'], reverse=True))
+        return scored_results
+
+    def score(self, queries: List[str], results: List[List[str]]) -> List[List[Dict]]:
+        """
+        Оценка всех кандидатов по всем запросам одним батчевым вызовом predict.
+
+        :param queries: Список поисковых запросов.
+        :param results: Список кандидатов для каждого запроса (results[i] относится к queries[i]).
+        :return: Для каждого запроса список {"content", "score", "index"}, отсортированный по убыванию score;
+                 index — позиция кандидата в results[i].
+        """
+        pairs = self._pairs(queries, results)
+        if not pairs:
+            return [[] for _ in results]
+        return self._group(results, self.predict(pairs))
+
+    async def ascore(self, queries: List[str], results: List[List[str]]) -> List[List[Dict]]:
+        """
+        Асинхронный вариант score, см. apredict.
+
+        :param queries: Список поисковых запросов.
+        :param results: Список кандидатов для каждого запроса.
+        :return: То же, что score.
+        """
+        pairs = self._pairs(queries, results)
+        if not pairs:
+            return [[] for _ in results]
+        return self._group(results, await self.apredict(pairs))
+
+    def rerank(self, query: List[str], results: List[List[str]]) -> str:
+        """
+        Реранкинг списка кандидатов: лучший кандидат для каждого запроса.
+
+        :param query: Список поисковых запросов.
+        :param results: Список кандидатов для каждого запроса.
+        :return: str
+        """
+        merge_best = ''
+        for scored_results in self.score(query, results):
+            if scored_results:
+                merge_best += scored_results[0]['content'] + '\n-----------------------------------------------\n'
 
-            # Сортировка по убыванию релевантности
-            scored_results = sorted(scored_results, key=lambda x: x['score'], reverse=True)
+        return merge_best
 
-            merge_best += scored_results[0]['content'] + '\n-----------------------------------------------\n'
 
-        return merge_best
\ No newline at end of file
+reranker = Reranker(
+    CONFIG.RERANKER_MODEL,
+    batch_size=CONFIG.RERANKER_BATCH_SIZE,
+    engine=CONFIG.RERANKER_ENGINE,
+    threads=CONFIG.RERANKER_THREADS,
+    workers=CONFIG.RERANKER_WORKERS,
+    max_batch_tokens=CONFIG.RERANKER_MAX_BATCH_TOKENS
+)
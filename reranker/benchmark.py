@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import random
+import time
+from typing import List, Tuple
+
+from chunker.Message_chunker import MessageChunker
+from chunker.benchmark import synthetic_chat
+from config import CONFIG
+from prompts.vector_search import vector_search_prompts
+from reranker.Reranker import Reranker
+
+
+def rag_requests(requests: int, candidates: int, seed: int = 0) -> List[List[Tuple[str, str]]]:
+    """
+    Пары (промпт, чанк), как в одном /rag-inference: каждый поисковый промпт
+    с candidates чанками переписки.
+    """
+    chunker = MessageChunker(max_tokens=CONFIG.CHUNK_MAX_TOKENS)
+    chunks = [chunk.text for chunk in chunker.split_text(synthetic_chat(messages=20_000, seed=seed))]
+    rng = random.Random(seed)
+    return [
+        [(prompt, rng.choice(chunks)) for prompt in vector_search_prompts for _ in range(candidates)]
+        for _ in range(requests)
+    ]
+
+
+async def bench(name: str, reranker: Reranker, requests: List[List[Tuple[str, str]]], warmup: int) -> None:
+    # Прогрев: загрузка модели в воркерах пула
+    await asyncio.gather(*(reranker.apredict(pairs) for pairs in requests[:warmup]))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(reranker.apredict(pairs) for pairs in requests))
+    elapsed = time.perf_counter() - start
+
+    pairs = sum(len(pairs) for pairs in requests)
+    print(f"{name:<28} пар: {pairs:>6}  пар/с: {pairs / elapsed:>8.1f}  "
+          f"запросов/с: {len(requests) / elapsed:>6.2f}  время: {elapsed:.2f}s")
+
+
+async def main():
+    """
+    Сравнивает пропускную способность конфигураций реранкера на парах,
+    похожих на /rag-inference. Независимые запросы подаются одновременно
+    через asyncio.gather по apredict, как из параллельных /rag-inference.
+
+    Запуск из корня репозитория:
+        python -m reranker.benchmark [--requests 16] [--candidates 10] [--workers 4] [--threads 1]
+    """
+    parser = argparse.ArgumentParser(description="Пропускная способность реранкера")
+    parser.add_argument("--requests", type=int, default=16, help="Число независимых запросов")
+    parser.add_argument("--candidates", type=int, default=10, help="Кандидатов на каждый промпт")
+    parser.add_argument("--workers", type=int, default=4, help="Размер пула процессов")
+    parser.add_argument("--threads", type=int, default=1, help="Потоки torch на процесс пула")
+    args = parser.parse_args()
+
+    requests = rag_requests(args.requests, args.candidates)
+    configurations = [
+        ("torch, без лимита токенов", dict(engine="torch", max_batch_tokens=10 ** 9)),
+        ("torch, бакеты", dict(engine="torch")),
+        ("int8, бакеты", dict(engine="int8")),
+        (f"int8, пул {args.workers}x{args.threads}", dict(engine="int8", workers=args.workers, threads=args.threads)),
+    ]
+    for name, options in configurations:
+        options.setdefault("max_batch_tokens", CONFIG.RERANKER_MAX_BATCH_TOKENS)
+        reranker = Reranker(CONFIG.RERANKER_MODEL, batch_size=CONFIG.RERANKER_BATCH_SIZE, **options)
+        try:
+            await bench(name, reranker, requests, warmup=max(1, args.workers))
+        finally:
+            reranker.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from loguru import logger
+from qdrant_client.models import ScoredPoint
+
+from config import CONFIG
+from executor import run_in_executor
+from generators.tokens import estimate_tokens
+from reranker.Reranker import Reranker, reranker
+
+SEPARATOR = '\n-----------------------------------------------\n'
+
+
+@dataclass
+class Candidate:
+    id: str
+    content: str
+    vector: Optional[np.ndarray]
+    relevance: float
+
+
+def _dense_vector(point: ScoredPoint) -> Optional[np.ndarray]:
+    vector = point.vector
+    if isinstance(vector, dict):
+        # Гибридные коллекции возвращают {"": dense, "bm25": sparse}
+        vector = vector.get("")
+    if vector is None:
+        return None
+    return np.asarray(vector, dtype=np.float32)
+
+
+def shingles(text: str, size: int = 3) -> Set[int]:
+    """Хэши словесных n-грамм текста."""
+    words = text.lower().split()
+    if len(words) < size:
+        return {hash(tuple(words))}
+    return {hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def containment(a: Set[int], b: Set[int]) -> float:
+    """Доля шинглов меньшего текста, встречающихся в другом."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+class ContextBuilder:
+    """
+    Сборка контекста для LLM из кандидатов всех поисковых промптов.
+
+    Кандидаты оцениваются кросс-энкодером, объединяются по id точки
+    (берётся лучший score среди промптов), почти-дубликаты отбрасываются по
+    шинглам, затем MMR по уже полученным векторам выбирает разнообразный
+    набор, который заполняет бюджет токенов.
+    """
+
+    def __init__(self,
+                 reranker: Reranker,
+                 token_budget: int = 3000,
+                 mmr_lambda: float = 0.7,
+                 dedup_threshold: float = 0.8):
+        """
+        :param reranker: Кросс-энкодер для оценки кандидатов.
+        :param token_budget: Бюджет токенов контекста.
+        :param mmr_lambda: Вес релевантности в MMR (1.0 — без учёта разнообразия).
+        :param dedup_threshold: Порог доли общих шинглов, выше которого чанк считается дубликатом.
+        """
+        self.reranker = reranker
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.dedup_threshold = dedup_threshold
+
+    @property
+    def signature(self) -> str:
+        """Параметры, влияющие на результат (для ключей кэша)."""
+        return f"context:{self.token_budget}:{self.mmr_lambda}:{self.dedup_threshold}"
+
+    def build(self, prompts: List[str], results: List[List[ScoredPoint]]) -> str:
+        """
+        Собирает контекст из результатов поиска.
+
+        :param prompts: Поисковые промпты.
+        :param results: Найденные точки для каждого промпта (results[i] относится к prompts[i]).
+        :return: str
+        """
+        return self._assemble(results, self.reranker.score(prompts, self._contents(results)))
+
+    async def abuild(self, prompts: List[str], results: List[List[ScoredPoint]]) -> str:
+        """
+        Асинхронный вариант build: скоринг ожидается на реранкере (пул
+        процессов или cpu_executor), остальная сборка выполняется в cpu_executor.
+
+        :param prompts: Поисковые промпты.
+        :param results: Найденные точки для каждого промпта.
+        :return: str
+        """
+        scored = await self.reranker.ascore(prompts, self._contents(results))
+        return await run_in_executor(self._assemble, results, scored)
+
+    @staticmethod
+    def _contents(results: List[List[ScoredPoint]]) -> List[List[str]]:
+        return [[point.payload['content'] for point in points] for points in results]
+
+    def _assemble(self, results: List[List[ScoredPoint]], scored: List[List[Dict]]) -> str:
+        candidates = self._pool(results, scored)
+        candidates = self._drop_near_duplicates(candidates)
+        selected = self._fill_budget(candidates, self._mmr_order(candidates))
+        logger.info(f"Context: {len(selected)} of {len(candidates)} unique chunks")
+        return ''.join(candidate.content + SEPARATOR for candidate in selected)
+
+    def _pool(self, results: List[List[ScoredPoint]], scored_results: List[List[Dict]]) -> List[Candidate]:
+        pool = {}
+        for points, scored in zip(results, scored_results):
+            for item in scored:
+                point = points[item['index']]
+                point_id = str(point.id)
+                if point_id not in pool:
+                    pool[point_id] = Candidate(point_id, item['content'], _dense_vector(point), item['score'])
+                elif item['score'] > pool[point_id].relevance:
+                    pool[point_id].relevance = item['score']
+
+        candidates = sorted(pool.values(), key=lambda c: c.relevance, reverse=True)
+        # Скоры кросс-энкодера — логиты; приводим к [0, 1], чтобы сопоставлять с косинусным сходством
+        if candidates:
+            high, low = candidates[0].relevance, candidates[-1].relevance
+            for candidate in candidates:
+                candidate.relevance = (candidate.relevance - low) / (high - low) if high > low else 1.0
+        return candidates
+
+    def _drop_near_duplicates(self, candidates: List[Candidate]) -> List[Candidate]:
+        kept, kept_shingles = [], []
+        for candidate in candidates:
+            candidate_shingles = shingles(candidate.content)
+            if any(containment(candidate_shingles, other) >= self.dedup_threshold for other in kept_shingles):
+                continue
+            kept.append(candidate)
+            kept_shingles.append(candidate_shingles)
+        return kept
+
+    def _mmr_order(self, candidates: List[Candidate]) -> List[int]:
+        """Порядок кандидатов по Maximal Marginal Relevance."""
+        n = len(candidates)
+        if n == 0:
+            return []
+        relevance = np.array([c.relevance for c in candidates], dtype=np.float32)
+
+        if any(c.vector is None for c in candidates):
+            similarity = np.zeros((n, n), dtype=np.float32)
+        else:
+            vectors = np.stack([c.vector for c in candidates])
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+            similarity = vectors @ vectors.T
+
+        order = []
+        max_similarity = np.zeros(n, dtype=np.float32)
+        available = np.ones(n, dtype=bool)
+        for _ in range(n):
+            scores = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * max_similarity
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            order.append(best)
+            available[best] = False
+            np.maximum(max_similarity, similarity[best], out=max_similarity)
+        return order
+
+    def _fill_budget(self, candidates: List[Candidate], order: List[int]) -> List[Candidate]:
+        selected = []
+        remaining = self.token_budget
+        separator_tokens = estimate_tokens(SEPARATOR)
+        for i in order:
+            tokens = estimate_tokens(candidates[i].content) + separator_tokens
+            # Самый релевантный чанк берём всегда, даже если он больше бюджета
+            if tokens <= remaining or not selected:
+                selected.append(candidates[i])
+                remaining -= tokens
+        return selected
+
+
+context_builder = ContextBuilder(
+    reranker,
+    token_budget=CONFIG.CONTEXT_TOKEN_BUDGET,
+    mmr_lambda=CONFIG.CONTEXT_MMR_LAMBDA,
+    dedup_threshold=CONFIG.CONTEXT_DEDUP_THRESHOLD
+)
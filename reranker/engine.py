@@ -0,0 +1,78 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+from loguru import logger
+from sentence_transformers import CrossEncoder
+
+from generators.tokens import estimate_tokens, length_buckets
+
+# Движки инференса кросс-энкодера
+ENGINES = ("torch", "int8")
+
+# Модель, загруженная в процессе-воркере пула (см. init_worker)
+_worker_model: Optional[CrossEncoder] = None
+
+
+def load_cross_encoder(model_name: str, engine: str = "torch", threads: int = 0) -> CrossEncoder:
+    """
+    Загрузка кросс-энкодера для CPU.
+
+    :param model_name: Имя модели CrossEncoder.
+    :param engine: "torch" — fp32, "int8" — динамическая int8-квантизация линейных слоёв.
+    :param threads: Число intra-op потоков torch (0 — не менять); задаётся только
+                    в процессах пула, в процессе API — потоком инференса.
+    :return: CrossEncoder
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown reranker engine: {engine}, expected one of {ENGINES}")
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+    model = CrossEncoder(model_name, device="cpu" if engine == "int8" else None)
+    if engine == "int8":
+        # Веса квантуются один раз при загрузке, активации — на лету
+        model.model = torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.model.eval()
+    logger.info(f"Loaded reranker model: {model_name} ({engine}, threads={torch.get_num_threads()})")
+    return model
+
+
+def predict_bucketed(
+        model: CrossEncoder,
+        pairs: List[Tuple[str, str]],
+        batch_size: int,
+        max_batch_tokens: int
+) -> np.ndarray:
+    """
+    Скоры пар в исходном порядке. Пары группируются по длине (length_buckets),
+    каждый бакет — один вызов predict.
+
+    :param model: Кросс-энкодер.
+    :param pairs: Пары (запрос, кандидат).
+    :param batch_size: Максимум пар в батче.
+    :param max_batch_tokens: Максимум токенов в батче с учётом паддинга.
+    :return: np.ndarray
+    """
+    lengths = [estimate_tokens(query) + estimate_tokens(candidate) for query, candidate in pairs]
+    scores = np.empty(len(pairs), dtype=np.float32)
+    with torch.inference_mode():
+        for bucket in length_buckets(lengths, batch_size, max_batch_tokens):
+            scores[bucket] = model.predict(
+                [pairs[i] for i in bucket],
+                batch_size=len(bucket),
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+    return scores
+
+
+def init_worker(model_name: str, engine: str, threads: int) -> None:
+    """Инициализатор процесса пула: модель загружается один раз на воркер."""
+    global _worker_model
+    _worker_model = load_cross_encoder(model_name, engine, threads)
+
+
+def worker_predict(pairs: List[Tuple[str, str]], batch_size: int, max_batch_tokens: int) -> np.ndarray:
+    """Скоринг пар одного запроса в процессе-воркере."""
+    return predict_bucketed(_worker_model, pairs, batch_size, max_batch_tokens)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Any, List
+from typing import Any, List, Optional
 
 
 class SearchResult(BaseModel):
@@ -15,12 +15,24 @@ class SearchRequest(BaseModel):
     text: str
     collection_name: str = Field(default="default_collection")
     limit: int = Field(default=5, ge=1, le=20)
+    exact: bool = Field(default=False, description="Exact (brute-force) search instead of the HNSW index")
 
 
 class SearchResponse(BaseModel):
     results: List[SearchResult]
 
 
+class BatchSearchRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=32)
+    collection_name: str = Field(default="default_collection")
+    limit: int = Field(default=5, ge=1, le=20)
+    exact: bool = Field(default=False, description="Exact (brute-force) search instead of the HNSW index")
+
+
+class BatchSearchResponse(BaseModel):
+    results: List[List[SearchResult]]
+
+
 class RAGRequest(BaseModel):
     collection_name: str = Field(default="default_collection")
     limit: int = Field(default=3, ge=1, le=10)
@@ -48,6 +60,22 @@ class UploadRequest(BaseModel):
 
 
 class UploadResponse(BaseModel):
-    chunks_count: int
+    job_id: str
+    collection_name: str
+    message: str = Field(default="Upload queued")
+
+
+class UploadStatusResponse(BaseModel):
+    job_id: str
     collection_name: str
-    message: str = Field(default="Upload successful")
+    filename: str
+    mode: str
+    stage: str
+    chunks_total: int
+    chunks_embedded: int
+    chunks_upserted: int
+    chunks_skipped: int
+    chunks_deleted: int
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -0,0 +1,37 @@
+import asyncio
+import time
+from typing import List, Optional, Union
+
+import httpx
+
+
+class CollectionsCache:
+    """
+    Short-lived copy of the API collection list.
+
+    Concurrent callers share one refresh; the list is dropped after `ttl`
+    seconds or explicitly via invalidate() once an upload changes it.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._collections: Optional[List[dict]] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self, http: httpx.AsyncClient) -> Union[List[dict], str]:
+        """Collection list, or an error message if the API call failed"""
+        async with self._lock:
+            if self._collections is not None and time.monotonic() < self._expires_at:
+                return self._collections
+            try:
+                response = await http.get("/collections")
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                return f"API Error: {str(e)}"
+            self._collections = response.json()['collections']
+            self._expires_at = time.monotonic() + self.ttl
+            return self._collections
+
+    def invalidate(self) -> None:
+        self._collections = None
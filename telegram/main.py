@@ -1,19 +1,32 @@
 import asyncio
+import httpx
 from aiogram import Bot, Dispatcher
 from router import router
+from collections_cache import CollectionsCache
 from config import CONFIG
 
 TELEGRAM_TOKEN = CONFIG.TELEGRAM_TOKEN
 
 async def main():
     bot = Bot(token=TELEGRAM_TOKEN)
-    dp = Dispatcher()
-    dp.include_router(router)
-    await dp.start_polling(bot)
+    # One pooled client for all handlers, so API calls reuse keep-alive connections
+    async with httpx.AsyncClient(
+        base_url=CONFIG.API_URL,
+        timeout=CONFIG.BOT_HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=CONFIG.BOT_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=CONFIG.BOT_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=CONFIG.BOT_HTTP_KEEPALIVE_EXPIRY
+        )
+    ) as http:
+        # Passed to handlers by parameter name
+        dp = Dispatcher(http=http, collections_cache=CollectionsCache(ttl=CONFIG.BOT_COLLECTIONS_TTL))
+        dp.include_router(router)
+        await dp.start_polling(bot)
 
 
 if __name__ == '__main__':
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        print('Бот выключен')
\ No newline at end of file
+        print('Бот выключен')
@@ -0,0 +1,99 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+from loguru import logger
+
+# Telegram rejects messages longer than 4096 characters
+MAX_MESSAGE_LENGTH = 4000
+
+
+def split_text(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Split text into parts of at most `limit` chars, preferring line breaks"""
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", limit // 2, limit)
+        if cut == -1:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    parts.append(text)
+    return parts
+
+
+async def answer_long(message: Message, text: str) -> None:
+    for part in split_text(text):
+        await message.answer(part)
+
+
+class ProgressMessage:
+    """
+    A bot message edited in place as text arrives.
+
+    Edits are throttled to `min_interval` seconds to stay within Telegram's
+    edit rate limits. When the text grows past MAX_MESSAGE_LENGTH the current
+    message is finalized and the rest continues in a new one.
+    """
+
+    def __init__(self, message: Message, min_interval: float = 1.5):
+        self.message = message
+        self.min_interval = min_interval
+        self._sent: Optional[Message] = None
+        self._text = ""
+        self._shown = ""
+        self._last_edit = 0.0
+
+    async def start(self, text: str) -> None:
+        self._text = self._shown = text
+        self._sent = await self.message.answer(text)
+        self._last_edit = time.monotonic()
+
+    async def set_text(self, text: str) -> None:
+        """Replace the text of the current message (status updates)"""
+        self._text = text[:MAX_MESSAGE_LENGTH]
+        await self._edit()
+
+    async def append(self, delta: str) -> None:
+        """Append streamed text, rolling over into new messages when needed"""
+        self._text += delta
+        while len(self._text) > MAX_MESSAGE_LENGTH:
+            head = split_text(self._text)[0]
+            rest = self._text[len(head):].lstrip("\n")
+            self._text = head
+            await self._edit(force=True)
+            # The next edit sends a fresh message for the remaining text
+            self._sent = None
+            self._shown = ""
+            self._text = rest
+        await self._edit()
+
+    async def finish(self) -> None:
+        await self._edit(force=True)
+
+    async def _edit(self, force: bool = False) -> None:
+        if self._text == self._shown or not self._text:
+            return
+        if self._sent is None:
+            await self.start(self._text)
+            return
+        if not force and time.monotonic() - self._last_edit < self.min_interval:
+            return
+
+        while True:
+            try:
+                await self._sent.edit_text(self._text)
+                break
+            except TelegramRetryAfter as e:
+                if not force:
+                    return
+                logger.warning(f"Telegram edit rate limit, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                if "message is not modified" not in str(e):
+                    raise
+                break
+
+        self._shown = self._text
+        self._last_edit = time.monotonic()
@@ -6,10 +6,21 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 import keyboards as kb
 import httpx
-from aiogram.exceptions import TelegramBadRequest
+import asyncio
+import json
+import uuid
+from progress import ProgressMessage, answer_long
+from collections_cache import CollectionsCache
 
 router = Router()
 
+# Total time for relaying a document from Telegram to the upload API
+UPLOAD_TIMEOUT = 180
+UPLOAD_POLL_INTERVAL = 3
+
+# Keeps references to background upload trackers so they are not garbage collected
+background_tasks = set()
+
 class UploadStates(StatesGroup):
     waiting_for_file = State()
 
@@ -21,6 +32,78 @@ async def make_api_call(client, method, url, **kwargs):
     except httpx.HTTPError as e:
         return f"API Error: {str(e)}"
 
+
+async def iter_sse(response):
+    """Parse a server-sent events stream into (event, data) pairs"""
+    event, data = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def multipart_stream(field, filename, chunks):
+    """
+    Wrap a byte stream into a single-file multipart/form-data body.
+
+    Returns the content type with its boundary and an async generator that
+    httpx sends with chunked transfer encoding, so the file is never held in memory.
+    """
+    boundary = uuid.uuid4().hex
+    safe_filename = filename.replace('"', '%22').replace('\r', '').replace('\n', '')
+
+    async def body():
+        yield (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; filename="{safe_filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode()
+        async for chunk in chunks:
+            yield chunk
+        yield f'\r\n--{boundary}--\r\n'.encode()
+
+    return f"multipart/form-data; boundary={boundary}", body()
+
+
+def format_upload_status(collection_name, status):
+    text = f"📥 Indexing into collection: {collection_name}\nStage: {status['stage']}\n"
+    if status['chunks_total']:
+        text += (f"Chunks: {status['chunks_total']} "
+                 f"(embedded {status['chunks_embedded']}, saved {status['chunks_upserted']}, "
+                 f"unchanged {status['chunks_skipped']})\n")
+    if status['error']:
+        text += f"Error: {status['error']}\n"
+    return text
+
+
+async def track_upload(
+        progress: ProgressMessage,
+        http: httpx.AsyncClient,
+        collections_cache: CollectionsCache,
+        job_id: str,
+        collection_name: str
+):
+    """Poll the ingestion job and keep the progress message up to date"""
+    while True:
+        await asyncio.sleep(UPLOAD_POLL_INTERVAL)
+        response = await make_api_call(http, 'GET', f"/upload/status/{job_id}")
+        if isinstance(response, str):
+            await progress.set_text(response)
+            break
+        status = response.json()
+        await progress.set_text(format_upload_status(collection_name, status))
+        if status['stage'] == 'completed':
+            # The collection may be new or have a different size now
+            collections_cache.invalidate()
+        if status['stage'] in ('completed', 'failed'):
+            break
+    await progress.finish()
+
 @router.message(CommandStart())
 async def cmd_start(message: Message):
     await message.answer('Welcome to Chat Analysis Bot!', reply_markup=kb.main)
@@ -31,27 +114,44 @@ async def upload_handler(message: Message, state: FSMContext):
     await message.answer('Please send me your chat file')
 
 @router.message(UploadStates.waiting_for_file, F.document)
-async def process_file(message: Message, state: FSMContext, bot: Bot):
+async def process_file(
+        message: Message,
+        state: FSMContext,
+        bot: Bot,
+        http: httpx.AsyncClient,
+        collections_cache: CollectionsCache
+):
     try:
         filename = message.document.file_name
         collection_name = filename.split('.')[0]  # Remove file extension
         
         file = await bot.get_file(message.document.file_id)
-        file_path = file.file_path
-        file_content = await bot.download_file(file_path)
-        
-        async with httpx.AsyncClient(timeout=180) as client:
-            files = {'file': (filename, file_content)}
-            response = await make_api_call(
-                client, 
-                'POST',
-                f"http://api:8000/upload/{collection_name}",
-                files=files
+        # Relay the file from Telegram to the API chunk by chunk instead of downloading it first.
+        # The download moves at the pace of the upload, so it gets the same time limit
+        file_chunks = bot.session.stream_content(
+            bot.session.api.file_url(bot.token, file.file_path),
+            timeout=UPLOAD_TIMEOUT
+        )
+        content_type, body = multipart_stream('file', filename, file_chunks)
+        response = await make_api_call(
+            http,
+            'POST',
+            f"/upload/{collection_name}",
+            content=body,
+            headers={'Content-Type': content_type},
+            timeout=UPLOAD_TIMEOUT
+        )
+        if isinstance(response, str):  # Error occurred
+            await message.answer(response)
+        else:
+            job_id = response.json()['job_id']
+            progress = ProgressMessage(message)
+            await progress.start(f"📥 File queued for indexing into collection: {collection_name}")
+            task = asyncio.create_task(
+                track_upload(progress, http, collections_cache, job_id, collection_name)
             )
-            if isinstance(response, str):  # Error occurred
-                await message.answer(response)
-            else:
-                await message.answer(f"File uploaded successfully to collection: {collection_name}")
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
         await state.clear()
     except Exception as e:
         await message.answer(f"Error processing file: {str(e)}")
@@ -62,23 +162,22 @@ class SearchStates(StatesGroup):
     waiting_for_query = State()
 
 @router.message(F.text == 'Search')
-async def search_handler(message: Message, state: FSMContext):
-    async with httpx.AsyncClient() as client:
-        # Сначала получаем список коллекций
-        response = await make_api_call(client, 'GET', "http://api:8000/collections")
-        if isinstance(response, str):
-            await message.answer(response)
-            return
-            
-        collections = response.json()['collections']
-        formatted_text = "Select collection number:\n\n"
-        for i, coll in enumerate(collections, 1):
-            formatted_text += f"{i}. {coll['name']}\n"
-        
-        # Сохраняем список коллекций в состояние
-        await state.update_data(collections={str(i): coll['name'] for i, coll in enumerate(collections, 1)})
-        await state.set_state(SearchStates.waiting_for_collection)
-        await message.answer(formatted_text)
+async def search_handler(message: Message, state: FSMContext, collections_cache: CollectionsCache,
+                         http: httpx.AsyncClient):
+    # Сначала получаем список коллекций
+    collections = await collections_cache.get(http)
+    if isinstance(collections, str):
+        await message.answer(collections)
+        return
+
+    formatted_text = "Select collection number:\n\n"
+    for i, coll in enumerate(collections, 1):
+        formatted_text += f"{i}. {coll['name']}\n"
+
+    # Сохраняем список коллекций в состояние
+    await state.update_data(collections={str(i): coll['name'] for i, coll in enumerate(collections, 1)})
+    await state.set_state(SearchStates.waiting_for_collection)
+    await message.answer(formatted_text)
 
 @router.message(SearchStates.waiting_for_collection)
 async def process_collection_choice(message: Message, state: FSMContext):
@@ -95,72 +194,62 @@ async def process_collection_choice(message: Message, state: FSMContext):
     await message.answer(f'Selected collection: {collection_name}\nWhat would you like to search for?')
 
 @router.message(SearchStates.waiting_for_query)
-async def process_search(message: Message, state: FSMContext):
+async def process_search(message: Message, state: FSMContext, http: httpx.AsyncClient):
     data = await state.get_data()
     collection_name = data.get('selected_collection', 'default_collection')
     logger.info(collection_name)
     logger.info(message.text)
-    async with httpx.AsyncClient(timeout=250) as client:
-        response = await make_api_call(
-            client,
-            'POST',
-            "http://api:8000/search",
-            json={
-                "text": message.text,
-                "collection_name": collection_name,
-                "limit": 6  # Limit to 3 results
-            }
-        )
-        if isinstance(response, str):
-            await message.answer(response)
-        else:
-            results = response.json()['results']
-            
-            # Format results nicely
-            formatted_text = "🔍 Search Results:\n\n"
-            for i, result in enumerate(results, 1):
-                text = result['text']
-                score = result['score']
-                # Truncate text if too long
-                if len(text) > 200:
-                    text = text[:200] + "..."
-                formatted_text += f"Result {i} (score: {score:.2f}):\n{text}\n\n"
-            
-            try:
-                await message.answer(formatted_text)
-            except TelegramBadRequest as e:
-                if "message is too long" in str(e):
-                    # Split into multiple messages if too long
-                    chunks = [formatted_text[i:i+4000] for i in range(0, len(formatted_text), 4000)]
-                    for chunk in chunks:
-                        await message.answer(chunk)
-                else:
-                    raise
+    response = await make_api_call(
+        http,
+        'POST',
+        "/search",
+        json={
+            "text": message.text,
+            "collection_name": collection_name,
+            "limit": 6  # Limit to 3 results
+        },
+        timeout=250
+    )
+    if isinstance(response, str):
+        await message.answer(response)
+    else:
+        results = response.json()['results']
+
+        # Format results nicely
+        formatted_text = "🔍 Search Results:\n\n"
+        for i, result in enumerate(results, 1):
+            text = result['text']
+            score = result['score']
+            # Truncate text if too long
+            if len(text) > 200:
+                text = text[:200] + "..."
+            formatted_text += f"Result {i} (score: {score:.2f}):\n{text}\n\n"
+
+        await answer_long(message, formatted_text)
     await state.clear()
 
 class RAGStates(StatesGroup):
     waiting_for_collection = State()
 
 @router.message(F.text == 'RAG Analysis')
-async def rag_handler(message: Message, state: FSMContext):
-    async with httpx.AsyncClient() as client:
-        # Получаем список коллекций
-        response = await make_api_call(client, 'GET', "http://api:8000/collections")
-        if isinstance(response, str):
-            await message.answer(response)
-            return
-            
-        collections = response.json()['collections']
-        formatted_text = "Select collection for analysis:\n\n"
-        for i, coll in enumerate(collections, 1):
-            formatted_text += f"{i}. {coll['name']}\n"
-        
-        await state.update_data(collections={str(i): coll['name'] for i, coll in enumerate(collections, 1)})
-        await state.set_state(RAGStates.waiting_for_collection)
-        await message.answer(formatted_text)
+async def rag_handler(message: Message, state: FSMContext, collections_cache: CollectionsCache,
+                      http: httpx.AsyncClient):
+    # Получаем список коллекций
+    collections = await collections_cache.get(http)
+    if isinstance(collections, str):
+        await message.answer(collections)
+        return
+
+    formatted_text = "Select collection for analysis:\n\n"
+    for i, coll in enumerate(collections, 1):
+        formatted_text += f"{i}. {coll['name']}\n"
+
+    await state.update_data(collections={str(i): coll['name'] for i, coll in enumerate(collections, 1)})
+    await state.set_state(RAGStates.waiting_for_collection)
+    await message.answer(formatted_text)
 
 @router.message(RAGStates.waiting_for_collection)
-async def process_rag(message: Message, state: FSMContext):
+async def process_rag(message: Message, state: FSMContext, http: httpx.AsyncClient):
     data = await state.get_data()
     collections = data.get('collections', {})
     
@@ -170,47 +259,38 @@ async def process_rag(message: Message, state: FSMContext):
         
     collection_name = collections[message.text]
     
-    async with httpx.AsyncClient(timeout=250) as client:
-        await message.answer("🔄 Analyzing messages, please wait...")
-        response = await make_api_call(
-            client,
-            'POST',
-            "http://api:8000/rag-inference",
-            json={
-                "collection_name": collection_name
-            }
-        )
-        if isinstance(response, str):
-            await message.answer(response)
-        else:
-            results = response.json()
-            try:
-                await message.answer(f"Analysis for {collection_name}:\n\n{results['answer']}")
-            except TelegramBadRequest as e:
-                if "message is too long" in str(e):
-                    chunks = [results['answer'][i:i+4000] for i in range(0, len(results['answer']), 4000)]
-                    for chunk in chunks:
-                        await message.answer(chunk)
-                else:
-                    raise
-    
     await state.clear()
 
+    progress = ProgressMessage(message)
+    await progress.start("🔄 Analyzing messages, please wait...")
+    try:
+        async with http.stream(
+            'POST',
+            "/rag-inference/stream",
+            json={"collection_name": collection_name},
+            timeout=httpx.Timeout(30, read=250)
+        ) as response:
+            response.raise_for_status()
+            async for event, data in iter_sse(response):
+                if event == 'context':
+                    await progress.set_text(f"Analysis for {collection_name}:\n\n")
+                elif event == 'delta':
+                    await progress.append(data['text'])
+                elif event == 'error':
+                    await progress.append(f"\n\nAPI Error: {data['detail']}")
+    except httpx.HTTPError as e:
+        await progress.append(f"\n\nAPI Error: {str(e)}")
+    await progress.finish()
+
 
 @router.message(F.text == 'Collections')
-async def collections_handler(message: Message):
-    async with httpx.AsyncClient() as client:
-        response = await make_api_call(
-            client,
-            'GET',
-            "http://api:8000/collections"
-        )
-        if isinstance(response, str):  # Error occurred
-            await message.answer(response)
-        else:
-            collections = response.json()['collections']
-            formatted_text = "📚 Collections:\n\n"
-            for coll in collections:
-                formatted_text += f"📁 {coll['name']}\n"
-                formatted_text += f"   Documents: {coll['vectors_count']}\n\n"
-            await message.answer(formatted_text)
\ No newline at end of file
+async def collections_handler(message: Message, collections_cache: CollectionsCache, http: httpx.AsyncClient):
+    collections = await collections_cache.get(http)
+    if isinstance(collections, str):  # Error occurred
+        await message.answer(collections)
+    else:
+        formatted_text = "📚 Collections:\n\n"
+        for coll in collections:
+            formatted_text += f"📁 {coll['name']}\n"
+            formatted_text += f"   Documents: {coll['vectors_count']}\n\n"
+        await message.answer(formatted_text)
\ No newline at end of file